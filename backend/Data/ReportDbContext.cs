@@ -19,7 +19,7 @@ public class ReportDbContext : DbContext
     modelBuilder.Entity<FieldDataEntity>(entity =>
     {
       entity.HasKey(e => e.Id);
-      entity.HasIndex(e => e.Field).IsUnique();
+      entity.HasIndex(e => e.Field).IsUnique().HasDatabaseName("IX_FieldData_Keys");
 
       entity.Property(e => e.Tuition).HasPrecision(18, 2);
       entity.Property(e => e.Earnings2018).HasPrecision(18, 2);
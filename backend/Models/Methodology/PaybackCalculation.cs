@@ -5,5 +5,7 @@ public class PaybackCalculation
   public decimal IncomeToDebtRepayment { get; set; }
   public decimal TaxRate { get; set; }
   public decimal InterestRate { get; set; }
+  public int GracePeriodYears { get; set; }
+  public decimal RepaymentIncomeGrowth { get; set; }
   public string Formula { get; set; } = string.Empty;
 }
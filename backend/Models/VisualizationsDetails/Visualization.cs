@@ -4,5 +4,7 @@ public class Visualization
 {
   public string Name { get; set; } = string.Empty;
   public string Filename { get; set; } = string.Empty;
+  // Rendition name (print, web, thumbnail, vector) -> filename
+  public Dictionary<string, string> Renditions { get; set; } = new();
   public string Description { get; set; } = string.Empty;
 }
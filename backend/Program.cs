@@ -6,9 +6,11 @@ var builder = WebApplication.CreateBuilder(args);
 
 builder.Services.AddControllers();
 
+// The database is built by the python pipeline (reports/RoiAnalysis.db) and only read here
 builder.Services.AddDbContext<ReportDbContext>(options =>
 {
   options.UseSqlite(builder.Configuration.GetConnectionString("DefaultConnection"));
+  options.UseQueryTrackingBehavior(QueryTrackingBehavior.NoTracking);
 });
 
 builder.Services.AddScoped<DataService>();
@@ -28,16 +30,6 @@ builder.Services.AddSwaggerGen();
 
 var app = builder.Build();
 
-using (var scope = app.Services.CreateScope())
-{
-  var context = scope.ServiceProvider.GetRequiredService<ReportDbContext>();
-  var dataService = scope.ServiceProvider.GetRequiredService<DataService>();
-
-  context.Database.EnsureCreated();
-
-  await DataSeeder.SeedDataAsync(context, dataService);
-}
-
 if (app.Environment.IsDevelopment())
 {
   app.UseSwagger();
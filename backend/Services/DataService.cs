@@ -6,9 +6,6 @@ using backend.Models.Rankings;
 using backend.Models.Summary;
 using backend.Models.Table;
 using backend.Models.VisualizationsDetails;
-using CsvHelper;
-using System.Globalization;
-using CsvHelper.Configuration;
 using backend.Data;
 using backend.Models.Entities;
 using Microsoft.EntityFrameworkCore;
@@ -18,6 +15,8 @@ namespace backend.Services;
 public class DataService
 {
   private readonly ReportDbContext? _context;
+  // Must match DATABASE_SCHEMA_VERSION in services/configs.py
+  private const int SchemaVersion = 1;
   // Report data (i.e. .json and .csv) are output but python service in /reports dir in root of project
   private string BasePath { get; } = "../reports";
   public Summary Summary { get; private set; } = new();
@@ -32,13 +31,13 @@ public class DataService
   {
     _context = context;
     LoadJsonData();
-    LoadCsvData();
+    LoadTableData();
   }
 
   // public DataService()
   // {
   //   LoadJsonData();
-  //   LoadCsvData();
+  //   LoadTableData();
   // }
 
   // TODO: Move async query functions to separate class
@@ -85,21 +84,37 @@ public class DataService
     Visualizations = tempVisualizations;
   }
 
-  // Read .csv files from /reports dir and store in-memory (also will be used to seed db)
-  private void LoadCsvData()
+  // Read the ROI table from the database written by the python service (rows are stored in ROI order)
+  private void LoadTableData()
   {
-    var csvPath = Path.Combine(BasePath, "roi_table.csv");
+    if (_context == null) return;
 
-    var config = new CsvConfiguration(CultureInfo.InvariantCulture)
-    {
-      HasHeaderRecord = true,
-    };
-
-    using var reader = new StreamReader(csvPath);
-    using var csv = new CsvReader(reader, config);
+    var version = _context.Database
+        .SqlQueryRaw<int>("SELECT user_version AS Value FROM pragma_user_version")
+        .AsEnumerable()
+        .Single();
+    if (version != SchemaVersion)
+      throw new InvalidOperationException($"Expected database schema version {SchemaVersion}, found {version}. Re-run the python service.");
 
-    csv.Context.RegisterClassMap<TableRowMap>();
-    var rows = csv.GetRecords<TableRow>().ToList();
+    var rows = _context.FieldData
+        .OrderBy(f => f.Id)
+        .Select(f => new TableRow
+        {
+          Field = f.Field,
+          Tuition = f.Tuition,
+          Earnings2018 = f.Earnings2018,
+          Earnings2024Adjusted = f.Earnings2024Adjusted,
+          EstimatedDebt = f.EstimatedDebt,
+          Enrollment = f.Enrollment,
+          TotalTuition = f.TotalTuition,
+          DebtToIncome = f.DebtToIncome,
+          PaybackYears = f.PaybackYears,
+          Earnings5yr = f.Earnings5yr,
+          Roi5yrWithDebt = f.Roi5yrWithDebt,
+          Roi5yrWithTuition = f.Roi5yrWithTuition,
+          EarningsPerDollarTuition = f.EarningsPerDollarTuition
+        })
+        .ToList();
 
     Table = new Table { RoiTable = rows };
   }
@@ -225,7 +225,13 @@ export default function MethodologyPage() {
                 <strong>Tax Rate:</strong> {(methodology.assumptions.paybackCalculation.taxRate * 100).toFixed(0)}%
               </div>
               <div style={styles.assumptionItem}>
-                <strong>Interest Rate:</strong> {(methodology.assumptions.paybackCalculation.interestRate * 100).toFixed(0)}%
+                <strong>Interest Rate:</strong> {(methodology.assumptions.paybackCalculation.interestRate * 100).toFixed(1)}%
+              </div>
+              <div style={styles.assumptionItem}>
+                <strong>Grace Period:</strong> {methodology.assumptions.paybackCalculation.gracePeriodYears} years
+              </div>
+              <div style={styles.assumptionItem}>
+                <strong>Repayment Growth:</strong> {((methodology.assumptions.paybackCalculation.repaymentIncomeGrowth - 1) * 100).toFixed(0)}% / year
               </div>
             </div>
             <div style={styles.formulaBox}>
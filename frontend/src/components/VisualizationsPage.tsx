@@ -95,6 +95,9 @@ export default function VisualizationsPage() {
   if (!visualizations) return null;
 
   const getImagePath = (filename: string) => `../figures/${filename}`;
+  // The print rendition is 300 dpi; pages show the lighter web rendition
+  const getWebFilename = (viz: VisualizationsDetails['visualizations'][number]) =>
+    viz.renditions?.web ?? viz.filename;
 
   return (
     <div style={styles.container}>
@@ -115,7 +118,7 @@ export default function VisualizationsPage() {
 
             <div style={styles.imageContainer}>
               <img 
-                src={getImagePath(viz.filename)} 
+                src={getImagePath(getWebFilename(viz))} 
                 alt={viz.name}
                 style={styles.image}
                 onError={(e) => {
@@ -126,7 +129,7 @@ export default function VisualizationsPage() {
                     const fallback = document.createElement('div');
                     fallback.style.cssText = 'padding: 60px; text-align: center; background-color: #f8f9fa; border-radius: 8px; color: #666;';
                     fallback.innerHTML = `
-                      <p>Image: ${viz.filename}</p>
+                      <p>Image: ${getWebFilename(viz)}</p>
                       <p style="font-size: 0.9rem; margin-top: 10px;">Place this file in <code>public/figures/</code></p>
                     `;
                     parent.appendChild(fallback);
@@ -161,10 +164,10 @@ export default function VisualizationsPage() {
         <div style={styles.downloadBox}>
           <h3>Accessing Visualization Files</h3>
           <p>All visualization files are available in the <code>figures/</code> directory of the project.</p>
-          <p>To view images in this interface, place the PNG files in <code>public/figures/</code>:</p>
+          <p>To view images in this interface, place the web renditions in <code>public/figures/</code>:</p>
           <ul>
             {visualizations.visualizations.map((viz, index) => (
-              <li key={index}><code>{viz.filename}</code></li>
+              <li key={index}><code>{getWebFilename(viz)}</code></li>
             ))}
           </ul>
         </div>
@@ -96,6 +96,8 @@ interface PaybackCalculation {
   incomeToDebtRepayment: number;
   taxRate: number;
   interestRate: number;
+  gracePeriodYears: number;
+  repaymentIncomeGrowth: number;
   formula: string;
 }
 
@@ -163,6 +165,7 @@ export interface PolicyRecommendations {
 interface Visualization {
   name: string;
   filename: string;
+  renditions: Record<string, string>;
   description: string;
 }
 
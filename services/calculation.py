@@ -1,42 +1,175 @@
+import numpy as np
 import pandas as pd
 
 from services.configs import (
+    GRACE_PERIOD_YEARS,
     INCOME_TO_PAYOFF,
+    INTEREST_RATE,
     RATE_OF_EARNING_GROWTH,
+    REPAYMENT_INCOME_GROWTH,
     TAX_RATE,
+    TIME_SERIES_COLUMNS,
     YEARS_OF_TUITION,
 )
 
 
-def calculate_roi_by_field(df: pd.DataFrame) -> pd.DataFrame:
-    df["total_tuition"] = df["tuition"] * YEARS_OF_TUITION
-    df["debt_to_income"] = df["estimated_debt"] / df["earnings_2024_adjusted"]
-    pass
+def amortized_payback_years(
+    debt,
+    annual_payment,
+    interest_rate=INTEREST_RATE,
+    grace_years=GRACE_PERIOD_YEARS,
+    payment_growth=REPAYMENT_INCOME_GROWTH,
+):
+    # Closed form for a loan repaid by year-end payments that grow with income:
+    #   balance = sum_{t<n} payment * g^t / (1 + r)^(t + 1)
+    # Interest accrues and income grows during the grace period. Returns years
+    # from graduation (grace included), inf if the debt is never repaid.
+    accrual = 1 + np.asarray(interest_rate, dtype=float)
+    payment_growth = np.asarray(payment_growth, dtype=float)
+    balance = debt * accrual**grace_years
+    payment = annual_payment * payment_growth**grace_years
+    ratio = balance * accrual / payment
+    x = payment_growth / accrual
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        remaining = 1 - ratio * (1 - x)
+        years = np.where(
+            np.isclose(x, 1),
+            ratio,
+            np.where(remaining > 0, np.log(remaining) / np.log(x), np.inf),
+        )
+
+    return years + grace_years
+
+
+def compute_roi_metrics(
+    tuition,
+    earnings,
+    debt,
+    tax_rate=TAX_RATE,
+    income_to_payoff=INCOME_TO_PAYOFF,
+    rate_of_earning_growth=RATE_OF_EARNING_GROWTH,
+    years_of_tuition=YEARS_OF_TUITION,
+    interest_rate=INTEREST_RATE,
+    grace_years=GRACE_PERIOD_YEARS,
+    payment_growth=REPAYMENT_INCOME_GROWTH,
+) -> dict:
+    # Pure arithmetic so it works for Series, scalars and broadcast NumPy arrays
+    total_tuition = tuition * years_of_tuition
+    debt_to_income = debt / earnings
 
     # Payback years (assuming 10% of post-tax income, 25% tax rate)
-    post_tax = df["earnings_2024_adjusted"] * (1 - TAX_RATE)
-    annual_payment = post_tax * INCOME_TO_PAYOFF
-    df["payback_years"] = df["estimated_debt"] / annual_payment
+    post_tax = earnings * (1 - tax_rate)
+    annual_payment = post_tax * income_to_payoff
+    payback_years = amortized_payback_years(
+        debt, annual_payment, interest_rate, grace_years, payment_growth
+    )
 
     # 5-year ROI (assume 3% annual salary growth)
-    df["earnings_5yr"] = df["earnings_2024_adjusted"] * (
-        RATE_OF_EARNING_GROWTH**3
-    )  # 3 more years of growth
-    avg_earnings = (df["earnings_2024_adjusted"] + df["earnings_5yr"]) / 2
+    earnings_5yr = earnings * (rate_of_earning_growth**3)  # 3 more years of growth
+    avg_earnings = (earnings + earnings_5yr) / 2
     cumulative_5yr = avg_earnings * 5
-    df["roi_5yr_w_debt"] = (cumulative_5yr - df["estimated_debt"]) / df[
-        "estimated_debt"
-    ]
-    df["roi_5yr_w_tuition"] = (cumulative_5yr - df["total_tuition"]) / df[
-        "total_tuition"
-    ]
-
-    df["earnings_per_dollar_tuition"] = (
-        df["earnings_2024_adjusted"] / df["total_tuition"]
+
+    return {
+        "total_tuition": total_tuition,
+        "debt_to_income": debt_to_income,
+        "payback_years": payback_years,
+        "earnings_5yr": earnings_5yr,
+        "roi_5yr_w_debt": (cumulative_5yr - debt) / debt,
+        "roi_5yr_w_tuition": (cumulative_5yr - total_tuition) / total_tuition,
+        "earnings_per_dollar_tuition": earnings / total_tuition,
+    }
+
+
+def calculate_roi_by_field(df: pd.DataFrame) -> pd.DataFrame:
+    metrics = compute_roi_metrics(
+        df["tuition"], df["earnings_2024_adjusted"], df["estimated_debt"]
     )
 
+    for col, values in metrics.items():
+        df[col] = values
+
     return df
 
 
-def calculate_roi_all_students(df: pd.DataFrame) -> float:
-    return (df["roi_5yr_w_tuition"] * df["enrollment"]).sum() / df["enrollment"].sum()
+def calculate_roi_time_series(df: pd.DataFrame) -> pd.DataFrame:
+    # merge_time_series output uses year-neutral amount names; they are mapped
+    # to the national names only for the shared ROI arithmetic
+    national = {neutral: name for name, neutral in TIME_SERIES_COLUMNS.items()}
+    roi = calculate_roi_by_field(df.rename(columns=national))
+    return roi.rename(columns=TIME_SERIES_COLUMNS)
+
+
+def scenario_grid(**assumptions) -> dict[str, np.ndarray]:
+    # Cartesian product of assumption values, flattened to one scenario axis
+    grids = np.meshgrid(
+        *[np.atleast_1d(values) for values in assumptions.values()], indexing="ij"
+    )
+    return {name: grid.ravel() for name, grid in zip(assumptions, grids)}
+
+
+def calculate_roi_scenarios(
+    df: pd.DataFrame,
+    tax_rate=TAX_RATE,
+    income_to_payoff=INCOME_TO_PAYOFF,
+    rate_of_earning_growth=RATE_OF_EARNING_GROWTH,
+    years_of_tuition=YEARS_OF_TUITION,
+    interest_rate=INTEREST_RATE,
+    grace_years=GRACE_PERIOD_YEARS,
+    payment_growth=REPAYMENT_INCOME_GROWTH,
+) -> dict[str, np.ndarray]:
+    # Each assumption is a scalar or a 1-D array of per-scenario values (all
+    # arrays the same length, e.g. from scenario_grid). Fields run along axis 0
+    # and scenarios along axis 1, so every metric is a (fields, scenarios)
+    # array computed in one broadcast.
+    assumptions = np.broadcast_arrays(
+        *[
+            np.atleast_1d(np.asarray(value, dtype=float))
+            for value in (
+                tax_rate,
+                income_to_payoff,
+                rate_of_earning_growth,
+                years_of_tuition,
+                interest_rate,
+                grace_years,
+                payment_growth,
+            )
+        ]
+    )
+    if assumptions[0].ndim != 1:
+        raise Exception("Scenario assumptions must be scalars or 1-D arrays")
+
+    def field_column(col: str) -> np.ndarray:
+        return df[col].to_numpy(dtype=float)[:, np.newaxis]
+
+    metrics = compute_roi_metrics(
+        field_column("tuition"),
+        field_column("earnings_2024_adjusted"),
+        field_column("estimated_debt"),
+        *[values[np.newaxis, :] for values in assumptions],
+    )
+
+    # Metrics that no assumption affects (debt_to_income) come out (fields, 1)
+    shape = (len(df), len(assumptions[0]))
+    return {
+        metric: values
+        if values.shape == shape
+        else np.broadcast_to(values, shape).copy()
+        for metric, values in metrics.items()
+    }
+
+
+def calculate_roi_all_students(
+    df: pd.DataFrame, segment_cols: list[str] | None = None
+) -> float | pd.Series:
+    weighted = df["roi_5yr_w_tuition"] * df["enrollment"]
+
+    if not segment_cols:
+        return weighted.sum() / df["enrollment"].sum()
+
+    # Enrollment-weighted ROI for every segment at once
+    groups = [df[col] for col in segment_cols]
+    return (
+        weighted.groupby(groups, observed=True).sum()
+        / df["enrollment"].groupby(groups, observed=True).sum()
+    )
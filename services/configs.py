@@ -1,3 +1,5 @@
+from datetime import timedelta
+import os
 from pathlib import Path
 
 
@@ -6,11 +8,72 @@ CPI_ADJUSTMENT_2018_TO_2025 = 1.24
 CPI_ADJUSTMENT_2020_TO_2024 = 1.14
 CPI_ADJUSTMENT_2020_TO_2025 = 1.17
 
+# Annual average CPI, all-items, Canada (2002=100), StatCan table 18-10-0005-01.
+# Used to move amounts between years in the time-series mode; 2025 is preliminary.
+CPI_BY_YEAR = {
+    2013: 122.8,
+    2014: 125.2,
+    2015: 126.6,
+    2016: 128.4,
+    2017: 130.4,
+    2018: 133.4,
+    2019: 136.0,
+    2020: 137.0,
+    2021: 141.6,
+    2022: 151.2,
+    2023: 157.1,
+    2024: 160.9,
+    2025: 164.6,
+}
+
 TAX_RATE = 0.25
 INCOME_TO_PAYOFF = 0.1
 RATE_OF_EARNING_GROWTH = 1.03
 YEARS_OF_TUITION = 4
+# Loan repayment terms; the defaults reproduce the simple debt / payment model
+INTEREST_RATE = 0.0
+GRACE_PERIOD_YEARS = 0
+REPAYMENT_INCOME_GROWTH = 1.0
 DEFAULT_PATH = Path("figures/")
+# Files written per figure from a single build: <name><suffix>.<format>. The
+# print PNG keeps the original filenames the report and frontend reference.
+FIGURE_RENDITIONS: dict[str, dict] = {
+    "print": {"format": "png", "dpi": 300},
+    "web": {"format": "webp", "dpi": 100},
+    "thumbnail": {"format": "png", "dpi": 30, "suffix": "_thumb"},
+    "vector": {"format": "svg"},
+}
+# Figures render in a process pool; 1 renders them one after another in-process
+PLOT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+# Report sections can be built in a process pool; 1 builds them in-process
+REPORT_MAX_WORKERS = 1
+
+# Monte Carlo spread around the point estimates: earnings and debt are
+# lognormal multipliers (median 1), growth and tax are normal around the above
+EARNINGS_SIGMA = 0.25
+DEBT_SIGMA = 0.3
+RATE_OF_EARNING_GROWTH_SD = 0.01
+TAX_RATE_SD = 0.03
+MONTE_CARLO_CHUNK_SIZE = 20_000
+# Draws are seeded per block of this many, so results do not depend on the
+# chunk size (chunks are rounded to whole blocks)
+MONTE_CARLO_SEED_BLOCK = 1_000
+# Chunks reduce their draws to per-field histograms of this many bins, which
+# bound memory for any draw count; percentiles are accurate to about a bin
+MONTE_CARLO_BINS = 10_000
+PARSED_CACHE_PATH = Path("data/parsed")
+# Memoized pipeline stage outputs, keyed by code, params and inputs
+PIPELINE_CACHE_PATH = Path("data/pipeline")
+# Per-run stage metrics (JSON) and optional cProfile captures
+METRICS_PATH = Path("data/metrics")
+
+# SQLite database the backend reads (read-only); bump the schema version
+# whenever the FieldData layout changes
+ROI_DATABASE_PATH = Path("reports/RoiAnalysis.db")
+DATABASE_SCHEMA_VERSION = 1
+
+# Markdown templates for REPORT.md and its sections
+REPORT_TEMPLATE_PATH = Path(__file__).parent / "templates"
 
 STAT_CAN_TABLES: dict[str, str] = {
     "tuition": "37-10-0003-01",
@@ -19,6 +82,106 @@ STAT_CAN_TABLES: dict[str, str] = {
     "enrollments": "37-10-0011-01",
 }
 
+# Only the columns the pipeline reads are parsed; dimension columns are categorical
+STAT_CAN_SCHEMAS: dict[str, dict[str, str]] = {
+    STAT_CAN_TABLES["tuition"]: {
+        "REF_DATE": "str",
+        "GEO": "category",
+        "Field of study": "category",
+        "VALUE": "float64",
+    },
+    STAT_CAN_TABLES["earnings"]: {
+        "REF_DATE": "int64",
+        "GEO": "category",
+        "Field of study": "category",
+        "VALUE": "float64",
+    },
+    STAT_CAN_TABLES["debt"]: {
+        "REF_DATE": "int64",
+        "GEO": "category",
+        "Level of study": "category",
+        "Statistics": "category",
+        "Type of debt source": "category",
+        "VALUE": "float64",
+    },
+    STAT_CAN_TABLES["enrollments"]: {
+        "REF_DATE": "str",
+        "GEO": "category",
+        "Field of study": "category",
+        "VALUE": "float64",
+    },
+}
+
+# filter_statcan_data arguments per table, pushed down into the chunked CSV reader
+STAT_CAN_FILTERS: dict[str, dict] = {
+    "tuition": {
+        "years_include": ["2020/2021", "2021/2022", "2022/2023", "2023/2024"],
+        "field_of_study_exclude": ["Total, field of study"],
+    },
+    "earnings": {
+        "years_include": [
+            2015,
+            2016,
+            2017,
+            2018,
+            2019,
+            2020,
+            2021,
+            2022,
+            2023,
+            2024,
+            2025,
+        ],
+        "field_of_study_exclude": ["Total, field of study"],
+    },
+    "enrollments": {
+        "years_include": ["2020/2021", "2021/2022", "2022/2023", "2023/2024"],
+        "field_of_study_exclude": ["Total, field of study"],
+    },
+    "debt": {
+        "years_include": [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024],
+        "level_of_study_include": ["Bachelor's"],
+    },
+}
+
+# Time-series mode widens the academic-year tables to every year the other
+# tables cover (earnings and debt already include 2015 onwards)
+TIME_SERIES_YEARS_INCLUDE: dict[str, list] = {
+    "tuition": [f"{year}/{year + 1}" for year in range(2015, 2026)],
+    "enrollments": [f"{year}/{year + 1}" for year in range(2015, 2026)],
+}
+
+# merge_time_series holds each REF_DATE's dollars, so its amounts carry
+# year-neutral names, mapped from the national ones here
+TIME_SERIES_COLUMNS = {
+    "earnings_2018": "earnings_source",
+    "earnings_2024_adjusted": "earnings_adjusted",
+}
+
+STATCAN_CSV_URL = "https://www150.statcan.gc.ca/n1/tbl/csv/"
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+DOWNLOAD_TIMEOUT = 60
+# A cached ZIP without stored validators (ETag/Last-Modified) can't be
+# revalidated; it is re-downloaded only once it is older than this
+DOWNLOAD_MAX_AGE = timedelta(days=7)
+
+# Tables are downloaded and parsed concurrently; 1 falls back to a serial fetch
+FETCH_MAX_WORKERS = len(STAT_CAN_TABLES)
+
+PROVINCES = [
+    "Canada",
+    "Newfoundland and Labrador",
+    "Prince Edward Island",
+    "Nova Scotia",
+    "New Brunswick",
+    "Quebec",
+    "Ontario",
+    "Manitoba",
+    "Saskatchewan",
+    "Alberta",
+    "British Columbia",
+]
+
 YEARS_TO_KEEP = [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025]
 
 FIELDS = [
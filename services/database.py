@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+from pathlib import Path
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from services.configs import DATABASE_SCHEMA_VERSION, ROI_DATABASE_PATH
+
+# FieldData column for each pipeline column (matches the backend's FieldDataEntity)
+FIELD_DATA_COLUMNS = {
+    "field": "Field",
+    "tuition": "Tuition",
+    "earnings_2018": "Earnings2018",
+    "earnings_2024_adjusted": "Earnings2024Adjusted",
+    "estimated_debt": "EstimatedDebt",
+    "enrollment": "Enrollment",
+    "total_tuition": "TotalTuition",
+    "debt_to_income": "DebtToIncome",
+    "payback_years": "PaybackYears",
+    "earnings_5yr": "Earnings5yr",
+    "roi_5yr_w_debt": "Roi5yrWithDebt",
+    "roi_5yr_w_tuition": "Roi5yrWithTuition",
+    "earnings_per_dollar_tuition": "EarningsPerDollarTuition",
+}
+
+
+def quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def create_tables(conn: sqlite3.Connection, segment_cols: list[str]) -> None:
+    columns = [f"{quote(col)} TEXT NOT NULL" for col in segment_cols]
+    for name in FIELD_DATA_COLUMNS.values():
+        if name == "Field":
+            columns.append('"Field" TEXT NOT NULL')
+        elif name == "Enrollment":
+            columns.append('"Enrollment" INTEGER NOT NULL')
+        else:
+            # Nullable: payback is NULL when the debt is never repaid, and the
+            # debt metrics are NULL for fields without a debt estimate
+            columns.append(f"{quote(name)} REAL")
+
+    conn.execute(f"""CREATE TABLE "FieldData" (
+            "Id" INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            {", ".join(columns)},
+            "CreatedAt" TEXT NOT NULL
+        )""")
+    conn.execute(
+        'CREATE TABLE "ExportInfo" ("Key" TEXT NOT NULL PRIMARY KEY, "Value" TEXT)'
+    )
+
+
+def create_indexes(conn: sqlite3.Connection, segment_cols: list[str]) -> None:
+    # Built after the bulk insert, which is cheaper than maintaining them row
+    # by row; one row per field (per segment), looked up by field
+    keys = ", ".join(quote(col) for col in [*segment_cols, "Field"])
+    conn.execute(f'CREATE UNIQUE INDEX "IX_FieldData_Keys" ON "FieldData" ({keys})')
+    if segment_cols:
+        conn.execute('CREATE INDEX "IX_FieldData_Field" ON "FieldData" ("Field")')
+
+
+def export_roi_database(
+    df: pd.DataFrame,
+    db_path: Path = ROI_DATABASE_PATH,
+    segment_cols: list[str] | None = None,
+) -> Path:
+    # Builds a fresh database next to the target and swaps it in, so every run
+    # replaces the previous data and readers never see a half-built file
+    segment_cols = segment_cols or []
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_name(f"{db_path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+
+    created_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    ordered = df.sort_values(
+        [*segment_cols, "roi_5yr_w_tuition"],
+        ascending=[True] * len(segment_cols) + [False],
+    )
+    values = ordered[[*segment_cols, *FIELD_DATA_COLUMNS]].replace(
+        [np.inf, -np.inf], np.nan
+    )
+    # Fields with no enrollment row (left merge) count as 0 students, as the
+    # backend's CSV converter did; the REAL metrics stay NULL when missing
+    values["enrollment"] = values["enrollment"].fillna(0).astype("int64")
+    values = values.astype(object).where(values.notna(), None)
+    values["CreatedAt"] = created_at
+    rows = list(values.itertuples(index=False, name=None))
+
+    columns = [*segment_cols, *FIELD_DATA_COLUMNS.values(), "CreatedAt"]
+    insert = (
+        f'INSERT INTO "FieldData" ({", ".join(map(quote, columns))}) '
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # The temp file is discarded on failure, so skip the rollback journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with conn:
+            create_tables(conn, segment_cols)
+            conn.executemany(insert, rows)
+            create_indexes(conn, segment_cols)
+            conn.executemany(
+                'INSERT INTO "ExportInfo" VALUES (?, ?)',
+                [
+                    ("created_at", created_at),
+                    ("rows", str(len(rows))),
+                    ("segments", ",".join(segment_cols)),
+                ],
+            )
+            conn.execute(f"PRAGMA user_version = {DATABASE_SCHEMA_VERSION}")
+        conn.close()
+        tmp_path.replace(db_path)
+    except Exception:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    print(f"Database saved: {db_path} ({len(rows)} rows)")
+    return db_path
@@ -1,34 +1,272 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import cache
+import hashlib
+import json
 from pathlib import Path
+import time
 import zipfile
 
 import pandas as pd
+from pandas.api.types import union_categoricals
 import requests
 
-from services.configs import YEARS_TO_KEEP
+from services.configs import (
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_MAX_AGE,
+    DOWNLOAD_TIMEOUT,
+    FETCH_MAX_WORKERS,
+    PARSED_CACHE_PATH,
+    STAT_CAN_SCHEMAS,
+    STATCAN_CSV_URL,
+    YEARS_TO_KEEP,
+)
+from services.normalization import filter_statcan_data
 
 
-def fetch_statcan_table(table_id: str, path: Path = Path("data/raw")) -> pd.DataFrame:
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parsed_cache_file(
+    table_id: str,
+    zip_path: Path,
+    years: list[int],
+    cache_path: Path,
+    schema: dict[str, str] | None = None,
+    filters: dict | None = None,
+) -> Path:
+    # Key on everything that changes the parsed result so stale entries are never
+    # reused. The name groups entries by the query (years, schema, filters), so
+    # a new ZIP replaces its own query's entry while other queries (national vs
+    # provincial runs) keep theirs
+    query = json.dumps(
+        {
+            "table_id": table_id,
+            "years": sorted(str(y) for y in years),
+            "schema": schema,
+            "filters": filters,
+        },
+        sort_keys=True,
+    )
+    query_hash = hashlib.sha256(query.encode()).hexdigest()[:8]
+    key_hash = hashlib.sha256((query + hash_file(zip_path)).encode()).hexdigest()[:16]
+
+    return cache_path / f"{table_id.replace('-', '')}-{query_hash}-{key_hash}.parquet"
+
+
+def read_parsed_cache(cache_file: Path) -> pd.DataFrame | None:
+    if not cache_file.exists():
+        return None
+
+    try:
+        return pd.read_parquet(cache_file)
+    except Exception as e:
+        print(f"Ignoring unreadable parsed cache {cache_file}: {e}")
+        return None
+
+
+def write_parsed_cache(df: pd.DataFrame, cache_file: Path) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Drop entries for older ZIPs of the same table and query
+    prefix = cache_file.name.rsplit("-", 1)[0]
+    for stale in cache_file.parent.glob(f"{prefix}-*.parquet"):
+        if stale != cache_file:
+            stale.unlink(missing_ok=True)
+
+    tmp_file = cache_file.with_suffix(".parquet.tmp")
+    try:
+        df.to_parquet(tmp_file, index=False)
+        tmp_file.replace(cache_file)
+    except Exception as e:
+        tmp_file.unlink(missing_ok=True)
+        print(f"Could not write parsed cache {cache_file}: {e}")
+
+
+@cache
+def get_session() -> requests.Session:
+    # Shared across downloads (and download threads) so connections are reused
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+
+def read_validators(meta_path: Path) -> dict[str, str]:
+    if not meta_path.exists():
+        return {}
+
+    try:
+        return json.loads(meta_path.read_text())
+    except ValueError:
+        return {}
+
+
+def write_validators(meta_path: Path, response: requests.Response) -> None:
+    validators = {
+        key: response.headers[header]
+        for key, header in [("etag", "ETag"), ("last_modified", "Last-Modified")]
+        if header in response.headers
+    }
+    meta_path.write_text(json.dumps(validators))
+
+
+def download_statcan_table(
+    table_id: str,
+    path: Path = Path("data/raw"),
+    base_url: str = STATCAN_CSV_URL,
+    revalidate: bool = True,
+) -> Path:
     clean_id = table_id.replace("-", "")
     path.mkdir(parents=True, exist_ok=True)
 
     zip_path = path / f"{clean_id[:-2]}-eng.zip"
+    meta_path = zip_path.with_suffix(".json")
+    part_path = zip_path.with_suffix(".zip.part")
+    part_meta_path = zip_path.with_suffix(".part.json")
 
-    # Try to use cached file first
-    if zip_path.exists():
+    if zip_path.exists() and not revalidate:
         print(f"Using cached {table_id}...")
-    else:
-        # Download directly
-        print(f"Downloading {table_id}...")
-        url = f"https://www150.statcan.gc.ca/n1/tbl/csv/{clean_id[:-2]}-eng.zip"
+        return zip_path
+
+    headers = {}
+
+    if part_path.exists():
+        # Resume an interrupted download; If-Range makes the server send the
+        # whole file instead if it changed since the partial was written
+        part_validators = read_validators(part_meta_path)
+        validator = part_validators.get("etag") or part_validators.get("last_modified")
+        if validator is not None:
+            headers["Range"] = f"bytes={part_path.stat().st_size}-"
+            headers["If-Range"] = validator
+    elif zip_path.exists():
+        # Only re-download the cached ZIP if StatCan has published a new one
+        validators = read_validators(meta_path)
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        # Without validators a request could only be a full download, so an
+        # unvalidated copy is kept until it is older than DOWNLOAD_MAX_AGE
+        age = time.time() - zip_path.stat().st_mtime
+        if not headers and age < DOWNLOAD_MAX_AGE.total_seconds():
+            print(f"Using cached {table_id} (no validators, recent copy)...")
+            return zip_path
+
+    url = f"{base_url}{clean_id[:-2]}-eng.zip"
+
+    def restart() -> Path:
+        # Partial file is unusable for this resource; start over
+        part_path.unlink(missing_ok=True)
+        part_meta_path.unlink(missing_ok=True)
+        return download_statcan_table(table_id, path, base_url, revalidate)
+
+    try:
+        with get_session().get(
+            url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+        ) as response:
+            if response.status_code == 304:
+                print(f"Using cached {table_id} (unchanged)...")
+                return zip_path
 
-        response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"})
+            if response.status_code == 416:
+                return restart()
 
-        if response.status_code != 200:
-            raise Exception(f"Failed to download {table_id}: {response.status_code}")
+            if response.status_code not in (200, 206):
+                raise requests.HTTPError(
+                    f"Failed to download {table_id}: {response.status_code}",
+                    response=response,
+                )
 
-        # Save the zip
-        zip_path.write_bytes(response.content)
-        print(f"Saved to {zip_path}")
+            resuming = response.status_code == 206
+            if resuming and not response.headers.get("Content-Range", "").startswith(
+                f"bytes {part_path.stat().st_size}-"
+            ):
+                # Appending a range that does not start where the partial file
+                # ends would corrupt the ZIP
+                return restart()
+
+            print(f"{'Resuming' if resuming else 'Downloading'} {table_id}...")
+
+            if not resuming:
+                write_validators(part_meta_path, response)
+
+            # Stream to disk in chunks so memory stays bounded regardless of
+            # ZIP size; an interrupted stream leaves the partial to resume from
+            with open(part_path, "ab" if resuming else "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+    except requests.RequestException as e:
+        # Timeouts, connection errors and error statuses alike: a cached copy
+        # is still valid data
+        if zip_path.exists():
+            print(f"Could not revalidate {table_id} ({e}), using cached copy...")
+            return zip_path
+        raise
+
+    part_path.replace(zip_path)
+    part_meta_path.replace(meta_path)
+    print(f"Saved to {zip_path}")
+
+    return zip_path
+
+
+def concat_chunks(chunks: list[pd.DataFrame]) -> pd.DataFrame:
+    if not chunks:
+        raise Exception("No chunks with a REF_DATE column to concatenate")
+
+    # pd.concat falls back to object dtype when chunk categories differ, so
+    # categorical columns are unioned separately to keep them compact
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals(
+                parts, ignore_order=True
+            ).remove_unused_categories()
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+
+    return pd.DataFrame(columns)
+
+
+def filter_chunk(chunk: pd.DataFrame, filters: dict | None) -> pd.DataFrame:
+    chunk = chunk[
+        chunk["REF_DATE"]
+        .astype(str)
+        .str[
+            :4
+        ]  # Take only the first 4 characters (the year) (Tuition and enrollments use e.g. "2015/2016"; read instead as "2015")
+        .isin([str(y) for y in YEARS_TO_KEEP])
+    ]
+
+    if filters is not None:
+        chunk = filter_statcan_data(chunk, **filters)
+
+    return chunk
+
+
+def parse_statcan_table(
+    table_id: str,
+    zip_path: Path,
+    cache_path: Path | None = PARSED_CACHE_PATH,
+    filters: dict | None = None,
+) -> pd.DataFrame:
+    schema = STAT_CAN_SCHEMAS.get(table_id)
+
+    # Use the already-parsed table if the ZIP, filters and schema are unchanged
+    if cache_path is not None:
+        cache_file = parsed_cache_file(
+            table_id, zip_path, YEARS_TO_KEEP, cache_path, schema, filters
+        )
+        cached = read_parsed_cache(cache_file)
+        if cached is not None:
+            print(f"Using parsed cache for {table_id}...")
+            return cached
 
     # Read the ZIP
     with zipfile.ZipFile(zip_path) as z:
@@ -39,30 +277,79 @@ def fetch_statcan_table(table_id: str, path: Path = Path("data/raw")) -> pd.Data
             raise Exception(f"No data CSV found. Contents: {z.namelist()}")
 
         with z.open(csv_files[0]) as f:
-            chunks = pd.read_csv(f, chunksize=10000)
-            df_filtered = pd.concat(
+            chunks = pd.read_csv(
+                f,
+                chunksize=10000,
+                usecols=list(schema) if schema else None,
+                dtype=schema,
+            )
+            # filters are the filter_statcan_data arguments, applied per chunk so
+            # rows for other years, provinces and levels are never accumulated
+            df_filtered = concat_chunks(
                 [
-                    chunk[
-                        chunk["REF_DATE"]
-                        .astype(str)
-                        .str[
-                            :4
-                        ]  # Take only the first 4 characters (the year) (Tuition and enrollments use e.g. "2015/2016"; read instead as "2015")
-                        .isin([str(y) for y in YEARS_TO_KEEP])
-                    ]
+                    filter_chunk(chunk, filters)
                     for chunk in chunks
                     if "REF_DATE" in chunk.columns
-                ],
-                ignore_index=True,
+                ]
             )
 
+    if cache_path is not None:
+        write_parsed_cache(df_filtered, cache_file)
+
     return df_filtered
 
 
-def fetch_all_statcan_tables(sources: dict[str, str]) -> dict[str, pd.DataFrame]:
-    data = {}
+def fetch_statcan_table(
+    table_id: str,
+    path: Path = Path("data/raw"),
+    cache_path: Path | None = PARSED_CACHE_PATH,
+    revalidate: bool = True,
+    filters: dict | None = None,
+) -> pd.DataFrame:
+    zip_path = download_statcan_table(table_id, path, revalidate=revalidate)
+    return parse_statcan_table(table_id, zip_path, cache_path, filters)
 
-    for name, table_id in sources.items():
-        data[name] = fetch_statcan_table(table_id)
 
-    return data
+def fetch_all_statcan_tables(
+    sources: dict[str, str],
+    path: Path = Path("data/raw"),
+    cache_path: Path | None = PARSED_CACHE_PATH,
+    max_workers: int = FETCH_MAX_WORKERS,
+    revalidate: bool = True,
+    filters: dict[str, dict] | None = None,
+) -> dict[str, pd.DataFrame]:
+    filters = filters or {}
+
+    if max_workers <= 1:
+        return {
+            name: fetch_statcan_table(
+                table_id, path, cache_path, revalidate, filters.get(name)
+            )
+            for name, table_id in sources.items()
+        }
+
+    # Downloads are I/O bound (threads); CSV parsing is CPU bound (processes).
+    # Each table is handed to the parser pool as soon as its download finishes.
+    with (
+        ThreadPoolExecutor(max_workers=max_workers) as downloader,
+        ProcessPoolExecutor(max_workers=max_workers) as parser,
+    ):
+        downloads = {
+            downloader.submit(
+                download_statcan_table, table_id, path, revalidate=revalidate
+            ): name
+            for name, table_id in sources.items()
+        }
+
+        parses = {}
+        for download in as_completed(downloads):
+            name = downloads[download]
+            parses[name] = parser.submit(
+                parse_statcan_table,
+                sources[name],
+                download.result(),
+                cache_path,
+                filters.get(name),
+            )
+
+        return {name: parses[name].result() for name in sources}
@@ -1,93 +1,167 @@
-from services.calculation import calculate_roi_by_field
-from services.configs import (
-    STAT_CAN_TABLES,
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+
+from services.configs import METRICS_PATH, PIPELINE_CACHE_PATH
+from services.pipeline import (
+    DEFAULT_PARAMS,
+    OUTPUT_STAGES,
+    STAGES,
+    run_pipeline,
+    write_run_metrics,
 )
-from services.fetch import fetch_statcan_table
-from services.plots import generate_all_plots
-from services.normalization import filter_statcan_data
-from services.preparation import (
-    estimate_debt_by_fields,
-    merge_dfs,
-    prepare_debt_data,
-    prepare_earnings_data,
-    prepare_enrollment_data,
-    prepare_tuition_data,
-)
-from services.report import generate_report
 
 # from mock import make_mock_merged_df
 
+# Named run configurations for --mode
+MODES = {
+    "national": {"by_province": False, "time_series": False},
+    "provincial": {"by_province": True, "time_series": False},
+    "time-series": {"by_province": False, "time_series": True},
+}
 
-def main():
-    tuition_data = filter_statcan_data(
-        fetch_statcan_table(STAT_CAN_TABLES["tuition"]),
-        ["2020/2021", "2021/2022", "2022/2023", "2023/2024"],
-        field_of_study_exclude=["Total, field of study"],
-    )
+# Intermediate stages dumped to stdout with --verbose
+DEBUG_STAGES = ["tuition", "earnings", "enrollment", "debt_by_field", "roi"]
 
-    prepared_tuition_data = prepare_tuition_data(tuition_data)
 
-    earnings_data = filter_statcan_data(
-        fetch_statcan_table(STAT_CAN_TABLES["earnings"]),
-        [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025],
-        field_of_study_exclude=["Total, field of study"],
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m services.main",
+        description="Fetch Statistics Canada data and build the ROI figures, reports and database.",
     )
-
-    earnings_by_major = (
-        earnings_data.groupby(["REF_DATE", "Field of study"])["VALUE"]
-        .mean()
-        .reset_index()
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="national",
+        help="run configuration (default: national)",
     )
-
-    prepared_earnings_data = prepare_earnings_data(earnings_by_major)
-
-    enrollment_data = filter_statcan_data(
-        fetch_statcan_table(STAT_CAN_TABLES["enrollments"]),
-        ["2020/2021", "2021/2022", "2022/2023", "2023/2024"],
-        field_of_study_exclude=["Total, field of study"],
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=STAGES,
+        default=OUTPUT_STAGES,
+        metavar="STAGE",
+        help=f"stages to bring up to date, with whatever they depend on "
+        f"(choices: {', '.join(STAGES)}; default: {' '.join(OUTPUT_STAGES)})",
     )
-
-    enrollment_summary = (
-        enrollment_data.groupby(["REF_DATE", "Field of study"])["VALUE"]
-        .sum()
-        .reset_index()
+    parser.add_argument(
+        "--figures-dir",
+        default=DEFAULT_PARAMS["figures_dir"],
+        help="directory for figures (default: %(default)s)",
     )
-
-    prepared_enrollment_data = prepare_enrollment_data(enrollment_summary)
-
-    debt_data = filter_statcan_data(
-        fetch_statcan_table(STAT_CAN_TABLES["debt"]),
-        [2015, 2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023, 2024],
-        level_of_study_include=["Bachelor's"],
+    parser.add_argument(
+        "--reports-dir",
+        default=DEFAULT_PARAMS["reports_dir"],
+        help="directory for reports and the SQLite database (default: %(default)s)",
     )
-
-    prepared_debt_data = prepare_debt_data(debt_data)
-    debts_by_field = estimate_debt_by_fields(
-        prepared_debt_data["debt_2024"].iloc[0], prepared_tuition_data
+    parser.add_argument(
+        "--cache-dir",
+        default=str(PIPELINE_CACHE_PATH),
+        help="directory for memoized stage outputs (default: %(default)s)",
     )
-
-    merged = merge_dfs(
-        prepared_tuition_data,
-        prepared_earnings_data,
-        prepared_enrollment_data,
-        debts_by_field,
+    parser.add_argument(
+        "--metrics-dir",
+        default=str(METRICS_PATH),
+        help="directory for per-run stage metrics (default: %(default)s)",
     )
-
-    merged_w_roi = calculate_roi_by_field(merged)
-
-    print("-----------------------TUITION-----------------------")
-    print(prepared_tuition_data)
-    print("-----------------------EARNINGS-----------------------")
-    print(prepared_earnings_data)
-    print("-----------------------ENROLLMENT-----------------------")
-    print(prepared_enrollment_data)
-    print("-----------------------DEBT-----------------------")
-    print(debts_by_field)
-    print(merged_w_roi)
-    print(merged_w_roi.columns)
-
-    generate_all_plots(merged_w_roi)
-    generate_report(merged_w_roi)
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rerun every selected stage instead of loading unchanged ones",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only report which stages are stale (still fetches data)",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="also print the intermediate DataFrames (computing them if needed)",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print a per-stage timing and memory table",
+    )
+    parser.add_argument(
+        "--profile-cpu",
+        action="store_true",
+        help="save a cProfile capture of each stage next to the run metrics",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record each stage's peak Python allocations (slows the run)",
+    )
+    return parser.parse_args(argv)
+
+
+def print_stage_table(stats: dict) -> None:
+    # Wall is the load time for unchanged stages; RSS +MB is how much the
+    # stage raised the process peak
+    columns = {
+        "Wall (s)": (["wall_seconds", "load_seconds"], ".2f"),
+        "CPU (s)": (["cpu_seconds"], ".2f"),
+        "Child CPU (s)": (["children_cpu_seconds"], ".2f"),
+        "RSS +MB": (["peak_rss_increase_mb"], ".0f"),
+        "Rows out": (["rows_out"], "d"),
+    }
+    print(f"\n{'Stage':<16}{'Status':<10}" + "".join(f"{c:>15}" for c in columns))
+    for name, stage_stats in stats.items():
+        cells = []
+        for keys, spec in columns.values():
+            value = next((stage_stats[k] for k in keys if k in stage_stats), None)
+            cells.append("-" if value is None else format(value, spec))
+        print(
+            f"{name:<16}{stage_stats['status']:<10}"
+            + "".join(f"{cell:>15}" for cell in cells)
+        )
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+
+    # Stages run as a DAG (tables -> tuition/earnings/enrollment/debt ->
+    # debt_by_field -> merged -> roi -> figures/reports/roi_database); stages
+    # whose code, params and inputs are unchanged are loaded from disk
+    params = {
+        **MODES[args.mode],
+        "figures_dir": args.figures_dir,
+        "reports_dir": args.reports_dir,
+    }
+    # Verbose runs also bring the intermediate stages up to date to print them
+    debug_stages = DEBUG_STAGES if args.verbose and not args.dry_run else []
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    metrics_path = Path(args.metrics_dir)
+    stats = {}
+    outputs = run_pipeline(
+        [*args.stages, *debug_stages],
+        params,
+        cache_path=Path(args.cache_dir),
+        use_cache=not args.force,
+        dry_run=args.dry_run,
+        stats=stats,
+        profile_path=metrics_path / f"run-{run_id}" if args.profile_cpu else None,
+        trace_memory=args.trace_memory,
+    )
+    if not args.dry_run:
+        write_run_metrics(stats, params, metrics_path / f"run-{run_id}.json")
+
+    if debug_stages:
+        print("-----------------------TUITION-----------------------")
+        print(outputs["tuition"])
+        print("-----------------------EARNINGS-----------------------")
+        print(outputs["earnings"])
+        print("-----------------------ENROLLMENT-----------------------")
+        print(outputs["enrollment"])
+        print("-----------------------DEBT-----------------------")
+        print(outputs["debt_by_field"])
+        print(outputs["roi"])
+        print(outputs["roi"].columns)
+
+    if args.timings or args.dry_run:
+        print_stage_table(stats)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,8 @@
+from functools import lru_cache
+import re
 from typing import Optional
+
+import numpy as np
 import pandas as pd
 
 
@@ -47,17 +51,44 @@ def normalize_ref_date(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def normalize_field_names(
-    df: pd.DataFrame, field_map: dict, field_col: str = "Field of study"
-) -> pd.DataFrame:
-    df = df.copy()
+FIELD_FOOTNOTE_PATTERN = re.compile(r"\s*\[\d+\]$")
+
 
-    df[field_col] = df[field_col].str.replace(r"\s*\[\d+\]$", "", regex=True)
+@lru_cache(maxsize=None)
+def clean_field_label(label: str) -> str:
+    return FIELD_FOOTNOTE_PATTERN.sub("", label)
 
-    df["field"] = df[field_col].map(field_map)
 
-    # unmapped = df[df["field"].isna()][field_col].unique()
-    # if len(unmapped) > 0:
-    #     print(f"Unmapped fields: {unmapped}")
+def normalize_field_names(
+    df: pd.DataFrame,
+    field_map: dict,
+    field_col: str = "Field of study",
+    report_unmapped: bool = False,
+) -> pd.DataFrame:
+    # Clean and map each distinct label once, then broadcast to rows via the
+    # categorical codes instead of running the regex/map over every row
+    labels = df[field_col].astype("category")
+    cleaned = pd.Index([clean_field_label(str(c)) for c in labels.cat.categories])
+    clean_categories = cleaned.unique()
+    fields = pd.Categorical(clean_categories.map(field_map))
+
+    unmapped = sorted(clean_categories[fields.codes < 0])
+    if report_unmapped and len(unmapped) > 0:
+        print(f"Unmapped fields: {unmapped}")
+
+    # A trailing -1 keeps missing labels (code -1) missing through each lookup
+    codes = labels.cat.codes.to_numpy()
+    clean_codes = np.append(clean_categories.get_indexer(cleaned), -1)[codes]
+    field_codes = np.append(fields.codes, -1)[clean_codes]
+    keep = field_codes >= 0
+
+    # Boolean indexing already returns a new frame, so no defensive copy is needed
+    result = df[keep].assign(
+        **{
+            field_col: pd.Categorical.from_codes(clean_codes[keep], clean_categories),
+            "field": pd.Categorical.from_codes(field_codes[keep], fields.categories),
+        }
+    )
+    result.attrs["unmapped_fields"] = unmapped
 
-    return df.dropna(subset=["field"])
+    return result
@@ -0,0 +1,523 @@
+import cProfile
+from datetime import datetime, timezone
+import hashlib
+import inspect
+import json
+from pathlib import Path
+import pickle
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from services import (
+    calculation,
+    configs,
+    database,
+    fetch,
+    normalization,
+    plots,
+    preparation,
+    report,
+)
+from services.calculation import calculate_roi_by_field, calculate_roi_time_series
+from services.configs import (
+    METRICS_PATH,
+    PIPELINE_CACHE_PATH,
+    PROVINCES,
+    REPORT_TEMPLATE_PATH,
+    ROI_DATABASE_PATH,
+    STAT_CAN_FILTERS,
+    STAT_CAN_TABLES,
+    TIME_SERIES_YEARS_INCLUDE,
+)
+from services.database import export_roi_database
+from services.fetch import fetch_all_statcan_tables
+from services.plots import generate_all_plots, generate_segment_plots
+from services.preparation import (
+    estimate_debt_by_fields,
+    merge_dfs,
+    merge_time_series,
+    prepare_debt_data,
+    prepare_earnings_data,
+    prepare_enrollment_data,
+    prepare_tuition_data,
+)
+from services.report import generate_report
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Stage name -> {"func", "deps", "code", "uses", "memoize", "writes_files"}, in
+# definition (topological) order
+STAGES = {}
+
+
+def stage(
+    deps: list[str] = (),
+    code: list = (),
+    uses: list[str] = ("by_province", "time_series"),
+    memoize: bool = True,
+    writes_files: bool = False,
+):
+    # Registers a pipeline stage. The stage function receives the run params and
+    # its dependencies' outputs as keyword arguments. `code` lists the modules
+    # (or template directories) whose contents the stage output depends on, and
+    # `uses` the params that affect it. Stages with `writes_files` return the
+    # files they wrote, and are only treated as unchanged while those exist
+    def decorator(func):
+        STAGES[func.__name__] = {
+            "func": func,
+            "deps": list(deps),
+            "code": [configs, *code],
+            "uses": list(uses),
+            "memoize": memoize,
+            "writes_files": writes_files,
+        }
+        return func
+
+    return decorator
+
+
+def code_digest(code: list) -> str:
+    digest = hashlib.sha256()
+    for item in code:
+        if isinstance(item, Path):
+            for path in sorted(item.rglob("*")):
+                if path.is_file():
+                    digest.update(path.read_bytes())
+        else:
+            digest.update(inspect.getsource(item).encode())
+    return digest.hexdigest()
+
+
+def output_digest(output) -> str:
+    # Content fingerprint for outputs of stages that are not memoized (fetch),
+    # so downstream keys change exactly when the data does
+    digest = hashlib.sha256()
+    frames = output if isinstance(output, dict) else {"": output}
+    for name, frame in sorted(frames.items()):
+        digest.update(name.encode())
+        digest.update(json.dumps(list(map(str, frame.columns))).encode())
+        digest.update(
+            pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes()
+        )
+    return digest.hexdigest()
+
+
+def peak_rss_mb(who: int | None = None) -> float | None:
+    # High-water mark of this process (or, with RUSAGE_CHILDREN, of its largest
+    # finished child) over its whole lifetime, not of any one stage
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # Reported in bytes on macOS and kilobytes on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+def children_cpu_seconds() -> float | None:
+    # CPU time of finished (and waited-for) child processes, e.g. the fetch,
+    # plot and report process pools once they shut down
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def count_rows(output) -> int | None:
+    if isinstance(output, pd.DataFrame):
+        return len(output)
+    if isinstance(output, dict):
+        return sum(
+            len(frame) for frame in output.values() if isinstance(frame, pd.DataFrame)
+        )
+    return None
+
+
+def segment_cols(params: dict) -> list[str]:
+    return ["GEO"] if params["by_province"] else []
+
+
+# Fetching always runs: its own download validators and parsed cache make a
+# no-change run cheap, and only it knows whether StatCan published new data
+@stage(code=[fetch, normalization], memoize=False)
+def tables(params: dict) -> dict[str, pd.DataFrame]:
+    # Provincial mode keeps GEO as a grouping key so every province is computed
+    # from one parse of each table; time-series mode keeps every year
+    filters = STAT_CAN_FILTERS
+    if params["time_series"]:
+        filters = {
+            name: {
+                **table_filters,
+                "years_include": TIME_SERIES_YEARS_INCLUDE.get(
+                    name, table_filters["years_include"]
+                ),
+            }
+            for name, table_filters in filters.items()
+        }
+    if params["by_province"]:
+        filters = {
+            name: {**table_filters, "locations_include": PROVINCES}
+            for name, table_filters in filters.items()
+        }
+
+    # Tables come back already filtered (filters are applied while parsing)
+    return fetch_all_statcan_tables(STAT_CAN_TABLES, filters=filters)
+
+
+@stage(deps=["tables"], code=[preparation, normalization])
+def tuition(params: dict, tables: dict) -> pd.DataFrame:
+    return prepare_tuition_data(
+        tables["tuition"], segment_cols(params), params["time_series"]
+    )
+
+
+@stage(deps=["tables"], code=[preparation, normalization])
+def earnings(params: dict, tables: dict) -> pd.DataFrame:
+    earnings_by_major = (
+        tables["earnings"]
+        .groupby(["REF_DATE", *segment_cols(params), "Field of study"])["VALUE"]
+        .mean()
+        .reset_index()
+    )
+    return prepare_earnings_data(
+        earnings_by_major, segment_cols(params), params["time_series"]
+    )
+
+
+@stage(deps=["tables"], code=[preparation, normalization])
+def enrollment(params: dict, tables: dict) -> pd.DataFrame:
+    enrollment_summary = (
+        tables["enrollments"]
+        .groupby(["REF_DATE", *segment_cols(params), "Field of study"])["VALUE"]
+        .sum()
+        .reset_index()
+    )
+    return prepare_enrollment_data(
+        enrollment_summary, segment_cols(params), params["time_series"]
+    )
+
+
+@stage(deps=["tables"], code=[preparation, normalization])
+def debt(params: dict, tables: dict) -> pd.DataFrame:
+    return prepare_debt_data(
+        tables["debt"], segment_cols(params), params["time_series"]
+    )
+
+
+@stage(deps=["tuition", "debt"], code=[preparation])
+def debt_by_field(params: dict, tuition: pd.DataFrame, debt: pd.DataFrame):
+    if params["time_series"]:
+        # Debt is carried per year by merge_time_series instead
+        return None
+
+    avg_debt = (
+        debt.set_index(segment_cols(params))["debt_2024"]
+        if params["by_province"]
+        else debt["debt_2024"].iloc[0]
+    )
+    return estimate_debt_by_fields(avg_debt, tuition, segment_cols(params))
+
+
+@stage(
+    deps=["tuition", "earnings", "enrollment", "debt", "debt_by_field"],
+    code=[preparation],
+)
+def merged(
+    params: dict,
+    tuition: pd.DataFrame,
+    earnings: pd.DataFrame,
+    enrollment: pd.DataFrame,
+    debt: pd.DataFrame,
+    debt_by_field,
+) -> pd.DataFrame:
+    if params["time_series"]:
+        # Every available year in one pass, indexed by (REF_DATE, [GEO,] field)
+        return merge_time_series(
+            tuition, earnings, enrollment, debt, segment_cols(params)
+        )
+    return merge_dfs(tuition, earnings, enrollment, debt_by_field, segment_cols(params))
+
+
+@stage(deps=["merged"], code=[calculation])
+def roi(params: dict, merged: pd.DataFrame) -> pd.DataFrame:
+    # calculate_roi_by_field adds its columns in place; merged is already
+    # memoized and must stay as stored
+    if params["time_series"]:
+        return calculate_roi_time_series(merged)
+    return calculate_roi_by_field(merged.copy())
+
+
+@stage(
+    deps=["roi"],
+    code=[plots],
+    uses=["by_province", "time_series", "figures_dir"],
+    writes_files=True,
+)
+def figures(params: dict, roi: pd.DataFrame) -> list[Path]:
+    if params["time_series"]:
+        return []
+
+    figures_path = Path(params["figures_dir"])
+    if not params["by_province"]:
+        return generate_all_plots(roi, figures_path)
+
+    files = generate_segment_plots(roi, "GEO", figures_path / "provinces")
+    for geo, province_df in roi.groupby("GEO", observed=True):
+        slug = geo.lower().replace(" ", "_")
+        province_df = province_df.drop(columns="GEO").reset_index(drop=True)
+        files += generate_all_plots(province_df, figures_path / "provinces" / slug)
+    return files
+
+
+@stage(
+    deps=["roi"],
+    code=[report, REPORT_TEMPLATE_PATH],
+    uses=["by_province", "time_series", "reports_dir"],
+    writes_files=True,
+)
+def reports(params: dict, roi: pd.DataFrame) -> list[Path]:
+    reports_path = Path(params["reports_dir"])
+    reports_path.mkdir(parents=True, exist_ok=True)
+
+    if params["time_series"]:
+        roi.to_csv(reports_path / "roi_time_series.csv")
+        return [reports_path / "roi_time_series.csv"]
+
+    if not params["by_province"]:
+        return generate_report(roi, reports_path)
+
+    roi.to_csv(reports_path / "roi_table_by_province.csv", index=False)
+    files = [reports_path / "roi_table_by_province.csv"]
+    for geo, province_df in roi.groupby("GEO", observed=True):
+        slug = geo.lower().replace(" ", "_")
+        province_df = province_df.drop(columns="GEO").reset_index(drop=True)
+        files += generate_report(province_df, reports_path / "provinces" / slug)
+    return files
+
+
+@stage(
+    deps=["roi"],
+    code=[database],
+    uses=["by_province", "time_series", "reports_dir"],
+    writes_files=True,
+)
+def roi_database(params: dict, roi: pd.DataFrame) -> list[Path]:
+    if params["time_series"]:
+        return []
+
+    reports_path = Path(params["reports_dir"])
+    if not params["by_province"]:
+        return [export_roi_database(roi, reports_path / ROI_DATABASE_PATH.name)]
+
+    return [
+        export_roi_database(
+            roi, reports_path / "RoiAnalysisByProvince.db", segment_cols(params)
+        )
+    ]
+
+
+OUTPUT_STAGES = ["figures", "reports", "roi_database"]
+
+DEFAULT_PARAMS = {
+    "by_province": False,
+    "time_series": False,
+    "figures_dir": "figures",
+    "reports_dir": "reports",
+}
+
+
+def run_pipeline(
+    targets: list[str] = OUTPUT_STAGES,
+    params: dict | None = None,
+    cache_path: Path = PIPELINE_CACHE_PATH,
+    use_cache: bool = True,
+    dry_run: bool = False,
+    stats: dict | None = None,
+    profile_path: Path | None = None,
+    trace_memory: bool = False,
+) -> dict:
+    # Each memoized stage is keyed on its code, the run params and its inputs'
+    # keys (or, for fetch, the fetched data itself). A stage whose key already
+    # has an output on disk is loaded instead of run, and its own inputs are
+    # only computed if some other stale stage needs them.
+    # `stats` (if given) is filled per stage with its status, wall and CPU time
+    # (own and of finished child processes), peak RSS figures and its rows
+    # in/out; unchanged stages record their load time. With
+    # `profile_path`, each stage that runs is profiled to {stage}.prof there;
+    # with `trace_memory`, the peak of Python allocations during each stage is
+    # recorded too. A dry run only works out which stages are stale; it still
+    # runs fetch, since downstream keys depend on the data
+    stats = {} if stats is None else stats
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    keys = {}
+    outputs = {}
+
+    # Entries are grouped per stage and the params it uses, so switching
+    # between e.g. national and provincial runs does not evict the other
+    # mode's outputs
+    def cache_file(name: str) -> Path:
+        used = {param: params.get(param) for param in STAGES[name]["uses"]}
+        params_id = hashlib.sha256(json.dumps(used, sort_keys=True).encode())
+        return (
+            cache_path
+            / f"{name}-{params_id.hexdigest()[:8]}-{stage_key(name)[:16]}.pkl"
+        )
+
+    def stage_key(name: str) -> str:
+        if name not in keys:
+            spec = STAGES[name]
+            inputs = [
+                stage_key(dep) if STAGES[dep]["memoize"] else output_digest(run(dep))
+                for dep in spec["deps"]
+            ]
+            keys[name] = hashlib.sha256(
+                json.dumps(
+                    {
+                        "stage": name,
+                        "code": code_digest([spec["func"], *spec["code"]]),
+                        "params": {param: params.get(param) for param in spec["uses"]},
+                        "inputs": inputs,
+                    },
+                    sort_keys=True,
+                ).encode()
+            ).hexdigest()
+        return keys[name]
+
+    def is_unchanged(name: str) -> bool:
+        spec = STAGES[name]
+        if not (spec["memoize"] and use_cache and cache_file(name).exists()):
+            return False
+        if not spec["writes_files"]:
+            return True
+        # Outputs deleted or moved since the last run have to be written again
+        with open(cache_file(name), "rb") as f:
+            return all(Path(file).exists() for file in pickle.load(f))
+
+    def run(name: str):
+        if name in outputs:
+            return outputs[name]
+
+        spec = STAGES[name]
+        if is_unchanged(name):
+            print(f"Stage unchanged: {name}")
+            stats[name] = {"status": "cached"}
+            outputs[name] = None
+            if not dry_run:
+                start = time.perf_counter()
+                with open(cache_file(name), "rb") as f:
+                    outputs[name] = pickle.load(f)
+                stats[name]["load_seconds"] = time.perf_counter() - start
+                stats[name]["rows_out"] = count_rows(outputs[name])
+            return outputs[name]
+
+        inputs = {dep: run(dep) for dep in spec["deps"]}
+        if dry_run and spec["memoize"]:
+            print(f"Stage would run: {name}")
+            stats[name] = {"status": "stale"}
+            outputs[name] = None
+            return None
+
+        print(f"Running stage: {name}")
+        if trace_memory:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile() if profile_path else None
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_cpu_start = children_cpu_seconds()
+        rss_start = peak_rss_mb()
+        if profiler:
+            outputs[name] = profiler.runcall(spec["func"], params, **inputs)
+        else:
+            outputs[name] = spec["func"](params, **inputs)
+        stats[name] = {
+            "status": "run",
+            "wall_seconds": time.perf_counter() - start,
+            # This process (all threads); pool workers are counted separately
+            "cpu_seconds": time.process_time() - cpu_start,
+            "rows_in": {dep: count_rows(output) for dep, output in inputs.items()},
+            "rows_out": count_rows(outputs[name]),
+        }
+        if resource is not None:
+            # The process-wide high-water mark so far, and how much this stage
+            # raised it (0 when it stayed below an earlier stage's peak)
+            stats[name].update(
+                {
+                    "children_cpu_seconds": children_cpu_seconds() - children_cpu_start,
+                    "process_peak_rss_mb": peak_rss_mb(),
+                    "peak_rss_increase_mb": peak_rss_mb() - rss_start,
+                    "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+                }
+            )
+        if trace_memory:
+            stats[name]["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / (
+                1 << 20
+            )
+        if profiler:
+            profile_path.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_path / f"{name}.prof")
+            stats[name]["profile"] = str(profile_path / f"{name}.prof")
+
+        if spec["memoize"]:
+            write_stage_output(outputs[name], cache_file(name))
+        return outputs[name]
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        return {name: run(name) for name in targets}
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def write_run_metrics(
+    stats: dict, params: dict, metrics_file: Path | None = None
+) -> Path:
+    # One JSON file per run, so stage timings can be compared across runs
+    now = datetime.now(timezone.utc)
+    if metrics_file is None:
+        metrics_file = METRICS_PATH / f"run-{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    metrics_file.parent.mkdir(parents=True, exist_ok=True)
+
+    metrics = {
+        "finished_at": now.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": {**DEFAULT_PARAMS, **params},
+        # Time spent running stages; loading unchanged ones is reported apart
+        "run_wall_seconds": sum(
+            stage_stats.get("wall_seconds", 0) for stage_stats in stats.values()
+        ),
+        "cached_load_seconds": sum(
+            stage_stats.get("load_seconds", 0) for stage_stats in stats.values()
+        ),
+        "process_peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": (
+            None if resource is None else peak_rss_mb(resource.RUSAGE_CHILDREN)
+        ),
+        "stages": stats,
+    }
+    metrics_file.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    print(f"Metrics saved: {metrics_file}")
+    return metrics_file
+
+
+def write_stage_output(output, cache_file: Path) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Drop entries for older inputs/code of the same stage and params
+    prefix = cache_file.name.rsplit("-", 1)[0]
+    for stale in cache_file.parent.glob(f"{prefix}-*.pkl"):
+        if stale != cache_file:
+            stale.unlink(missing_ok=True)
+
+    tmp_file = cache_file.with_suffix(".pkl.tmp")
+    with open(tmp_file, "wb") as f:
+        pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_file.replace(cache_file)
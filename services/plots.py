@@ -1,14 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache, wraps
+import hashlib
+import inspect
+import json
 from pathlib import Path
+import sys
 
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
 from matplotlib.ticker import FuncFormatter
+import numpy as np
 import pandas as pd
 
-from services.configs import DEFAULT_PATH
+from services.configs import DEFAULT_PATH, FIGURE_RENDITIONS, PLOT_MAX_WORKERS
 
 
-def plot_tuition_vs_earnings(df: pd.DataFrame, path: Path = DEFAULT_PATH):
-    fig, ax = plt.subplots(figsize=(12, 8))
+@cache
+def module_source(module_name: str) -> bytes:
+    return inspect.getsource(sys.modules[module_name]).encode()
+
+
+def figure_cache_key(plotter, df: pd.DataFrame, columns: list[str], **params) -> str:
+    # Inputs that change the rendered pixels: data, parameters (renditions
+    # included), the matplotlib version and the plotting code. That is the
+    # whole plotting module, since helpers like save_renditions, place_labels
+    # and the formatters live outside the plotter
+    digest = hashlib.sha256()
+    digest.update(module_source(plotter.__module__))
+    digest.update(matplotlib.__version__.encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(
+        pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+def rendition_files(path: Path, name: str, renditions: dict[str, dict]) -> list[Path]:
+    return [
+        path / f"{name}{rendition.get('suffix', '')}.{rendition['format']}"
+        for rendition in renditions.values()
+    ]
+
+
+def save_renditions(
+    fig: Figure, path: Path, name: str, renditions: dict[str, dict]
+) -> list[Path]:
+    # One figure build, saved once per rendition (thumbnail, web, print, SVG...)
+    files = rendition_files(path, name, renditions)
+    for figure_file, rendition in zip(files, renditions.values()):
+        fig.savefig(
+            figure_file,
+            format=rendition["format"],
+            dpi=rendition.get("dpi", "figure"),
+            bbox_inches="tight",
+        )
+    return files
+
+
+def cached_figure(name: str, columns: list[str]):
+    # Wraps a function that builds and returns a Figure: the wrapper saves every
+    # rendition and skips the build entirely when nothing it depends on changed
+    def decorator(plotter):
+        def cache_key(df: pd.DataFrame, renditions: dict[str, dict]) -> str:
+            return figure_cache_key(
+                plotter, df, columns, name=name, renditions=renditions
+            )
+
+        def is_current(
+            df: pd.DataFrame,
+            path: Path = DEFAULT_PATH,
+            renditions: dict[str, dict] = FIGURE_RENDITIONS,
+        ) -> bool:
+            stamp_file = path / f".{name}.sha256"
+            return (
+                all(f.exists() for f in rendition_files(path, name, renditions))
+                and stamp_file.exists()
+                and stamp_file.read_text() == cache_key(df, renditions)
+            )
+
+        @wraps(plotter)
+        def wrapper(
+            df: pd.DataFrame,
+            path: Path = DEFAULT_PATH,
+            use_cache: bool = True,
+            renditions: dict[str, dict] = FIGURE_RENDITIONS,
+        ):
+            if use_cache and is_current(df, path, renditions):
+                print(f"Plot unchanged, skipping: {path / name}")
+                return rendition_files(path, name, renditions)
+
+            files = save_renditions(plotter(df), path, name, renditions)
+            (path / f".{name}.sha256").write_text(cache_key(df, renditions))
+            print(f"Plot saved: {', '.join(str(f) for f in files)}")
+            return files
+
+        wrapper.is_current = is_current
+        wrapper.files = lambda path=DEFAULT_PATH, renditions=FIGURE_RENDITIONS: (
+            rendition_files(path, name, renditions)
+        )
+        return wrapper
+
+    return decorator
+
+
+def field_labels(fields: pd.Series) -> np.ndarray:
+    return fields.astype(str).str.replace("_", " ").str.title().to_numpy()
+
+
+def place_labels(
+    x: np.ndarray,
+    y: np.ndarray,
+    widths: np.ndarray,
+    height: float,
+    gap: float = 4.0,
+    obstacles: np.ndarray | None = None,
+) -> np.ndarray:
+    # Greedy collision-aware placement in display space: each label takes the
+    # first candidate position (above, below, right, left, then further out)
+    # whose box does not overlap a label already placed. Boxes are
+    # (x0, y0, x1, y1) centred on the anchor plus the candidate offset.
+    # Obstacles (e.g. the markers themselves) are boxes labels must avoid too
+    n = len(x)
+    candidates = np.stack(
+        [
+            np.zeros(n),
+            np.full(n, gap + height / 2),
+            np.zeros(n),
+            np.full(n, -(gap + height / 2)),
+            gap + widths / 2,
+            np.zeros(n),
+            -(gap + widths / 2),
+            np.zeros(n),
+            np.zeros(n),
+            np.full(n, 2 * gap + 1.5 * height),
+            np.zeros(n),
+            np.full(n, -(2 * gap + 1.5 * height)),
+        ],
+        axis=1,
+    ).reshape(n, -1, 2)
+
+    centres = np.stack([x, y], axis=1)[:, None, :] + candidates
+    half = np.stack([widths / 2, np.full(n, height / 2)], axis=1)[:, None, :]
+    boxes = np.concatenate([centres - half, centres + half], axis=2)
+
+    placed = np.empty((0, 4)) if obstacles is None else obstacles
+    offsets = np.empty((n, 2))
+    for i in range(n):
+        overlaps = (
+            (boxes[i, :, None, 0] < placed[None, :, 2])
+            & (boxes[i, :, None, 2] > placed[None, :, 0])
+            & (boxes[i, :, None, 1] < placed[None, :, 3])
+            & (boxes[i, :, None, 3] > placed[None, :, 1])
+        ).sum(axis=1)
+        best = np.argmin(overlaps)
+        offsets[i] = candidates[i, best]
+        placed = np.vstack([placed, boxes[i, best]])
+
+    return offsets
+
+
+def annotate_points(
+    ax, x, y, labels: np.ndarray, fontsize: int = 12, marker_size: float = 0
+):
+    # Label sizes are estimated from character counts so placement needs no
+    # renderer; offsets are computed in points and applied relative to each
+    # data point, which keeps them valid after tight_layout
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    points = ax.transData.transform(np.column_stack([x, y])) * 72 / ax.figure.dpi
+    widths = np.char.str_len(labels.astype(str)) * fontsize * 0.6
+    radius = np.sqrt(marker_size) / 2
+    markers = np.concatenate([points - radius, points + radius], axis=1)
+    offsets = place_labels(
+        points[:, 0],
+        points[:, 1],
+        widths,
+        fontsize * 1.2,
+        gap=radius + 2,
+        obstacles=markers,
+    )
+
+    for xy, xytext, label in zip(zip(x, y), offsets, labels):
+        ax.annotate(
+            label,
+            xy,
+            xytext=xytext,
+            textcoords="offset points",
+            ha="center",
+            va="center",
+            fontsize=fontsize,
+        )
+
+
+@cached_figure(
+    "tuition_vs_earnings", ["field", "total_tuition", "earnings_2024_adjusted"]
+)
+def plot_tuition_vs_earnings(df: pd.DataFrame) -> Figure:
+    # Figures are built with the object-oriented API (Agg canvas, no pyplot
+    # state machine) so they can render safely in worker processes
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
 
     def thousands(x, pos):
         return f"${x * 1e-3:,.0f}k"
@@ -39,77 +229,73 @@ def plot_tuition_vs_earnings(df: pd.DataFrame, path: Path = DEFAULT_PATH):
     ax.xaxis.set_major_formatter(formatter)
     ax.yaxis.set_major_formatter(formatter)
 
-    # Add field labels
-    for _, row in df.iterrows():
-        ax.text(
-            row["total_tuition"],
-            row["earnings_2024_adjusted"] + 750,
-            row["field"].replace("_", " ").title(),
-            fontsize=12,
-            ha="center",
-        )
+    annotate_points(
+        ax,
+        df["total_tuition"],
+        df["earnings_2024_adjusted"],
+        field_labels(df["field"]),
+        marker_size=200,
+    )
 
     ax.set_xlabel("Total Tuition (4 years, CAD)")
     ax.set_ylabel("Median Earnings 2 Years After Graduation (2024 adjusted, CAD)")
     ax.set_title("Tuition vs Earnings by Field of Study")
     ax.grid(True, alpha=0.3, linestyle="--")
 
-    plt.tight_layout()
-    plt.savefig(path / "tuition_vs_earnings.png", dpi=300, bbox_inches="tight")
-    plt.close()
+    fig.tight_layout()
 
-    print(f"Plot Tuition vs. Earnings saved: {path / 'tuition_vs_earnings.png.png'}")
+    return fig
 
 
 def plot_roi_vs_enrollment(df: pd.DataFrame, path: Path = DEFAULT_PATH):
     pass
 
 
-def plot_debt_to_income(df: pd.DataFrame, path: Path = DEFAULT_PATH):
+@cached_figure("debt_to_income_ratio", ["field", "debt_to_income"])
+def plot_debt_to_income(df: pd.DataFrame) -> Figure:
     df_sorted = df.sort_values("debt_to_income", ascending=True)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
 
-    ax.barh(
+    bars = ax.barh(
         range(len(df_sorted)), df_sorted["debt_to_income"], alpha=0.7, edgecolor="black"
     )
 
     ax.axvline(x=1.0, color="red", linestyle="--", linewidth=1.5, alpha=0.6)
 
     ax.set_yticks(range(len(df_sorted)))
-    ax.set_yticklabels(
-        [field.replace("_", " ").title() for field in df_sorted["field"]]
-    )
+    ax.set_yticklabels(field_labels(df_sorted["field"]))
     ax.set_xlabel("Debt-to-Income Ratio")
     ax.set_title("Student Debt Burden by Field of Study")
     # ax.set_title(
     #     "Student Debt Burden by Field of Study\nEstimated Debt / Median Earnings (After 2 Years)"
     # )
 
-    for i, (idx, row) in enumerate(df_sorted.iterrows()):
-        value = row["debt_to_income"]
-        ax.text(value + 0.05, i, f"{value:.2f}x", va="center", fontsize=12)
+    values = df_sorted["debt_to_income"].to_numpy()
+    ax.bar_label(bars, labels=np.char.mod("%.2fx", values), padding=3, fontsize=12)
 
     x_min, x_max = df["debt_to_income"].min(), df["debt_to_income"].max()
     x_buffer = (x_max - x_min) * 0.15
     ax.set_xlim(x_min - x_buffer, x_max + x_buffer)
 
     ax.grid(axis="x", alpha=0.3)
-    plt.tight_layout()
-    plt.savefig(path / "debt_to_income_ratio.png", dpi=300, bbox_inches="tight")
-    plt.close()
-    print(f"Plot Debt / Income Ratio saved: {path / 'debt_to_income_ratio.png'}")
+    fig.tight_layout()
 
+    return fig
 
-def plot_payback_years(df: pd.DataFrame, path: Path = DEFAULT_PATH):
+
+@cached_figure("payback_years", ["field", "payback_years"])
+def plot_payback_years(df: pd.DataFrame) -> Figure:
     df_sorted = df.sort_values("payback_years", ascending=True)
 
     # Cap at 30 years for visualization
     df_sorted["payback_years_capped"] = df_sorted["payback_years"].clip(upper=30)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
 
-    ax.barh(
+    bars = ax.barh(
         range(len(df_sorted)),
         df_sorted["payback_years_capped"],
         alpha=0.7,
@@ -120,9 +306,7 @@ def plot_payback_years(df: pd.DataFrame, path: Path = DEFAULT_PATH):
     ax.axvline(x=20, color="red", linestyle="--", linewidth=1.5, alpha=0.4)
 
     ax.set_yticks(range(len(df_sorted)))
-    ax.set_yticklabels(
-        [field.replace("_", " ").title() for field in df_sorted["field"]]
-    )
+    ax.set_yticklabels(field_labels(df_sorted["field"]))
     ax.set_xlabel("Years to Pay Off Student Debt")
     ax.set_title("How Long Will It Take to Pay Off Student Debt?")
     # ax.set_title(
@@ -130,25 +314,24 @@ def plot_payback_years(df: pd.DataFrame, path: Path = DEFAULT_PATH):
     # )
 
     # Add value labels on bars
-    for i, (idx, row) in enumerate(df_sorted.iterrows()):
-        value = row["payback_years"]
-        display_value = min(value, 30)
-        label = f"{value:.1f} years" if value < 30 else "30+ years"
-        ax.text(display_value + 0.5, i, label, va="center", fontsize=12)
+    values = df_sorted["payback_years"].to_numpy()
+    labels = np.where(values < 30, np.char.mod("%.1f years", values), "30+ years")
+    ax.bar_label(bars, labels=labels, padding=3, fontsize=12)
 
     ax.grid(axis="x", alpha=0.3)
     ax.set_xlim(0, 32)
 
-    plt.tight_layout()
-    plt.savefig(path / "payback_years.png", dpi=300, bbox_inches="tight")
-    plt.close()
-    print(f"Plot Payback Years saved: {path / 'payback_years.png'}")
+    fig.tight_layout()
 
+    return fig
 
-def plot_roi_by_field(df: pd.DataFrame, output_path: Path):
+
+@cached_figure("roi_by_field", ["field", "roi_5yr_w_tuition", "roi_5yr_w_debt"])
+def plot_roi_by_field(df: pd.DataFrame) -> Figure:
     df_sorted = df.sort_values("roi_5yr_w_tuition", ascending=False)
 
-    fig, ax = plt.subplots(figsize=(12, 8))
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
 
     x = range(len(df_sorted))
     width = 0.35
@@ -193,9 +376,7 @@ def plot_roi_by_field(df: pd.DataFrame, output_path: Path):
     )
 
     ax.set_yticks(x)
-    ax.set_yticklabels(
-        [field.replace("_", " ").title() for field in df_sorted["field"]]
-    )
+    ax.set_yticklabels(field_labels(df_sorted["field"]))
     ax.set_xlabel("5-Year Return on Investment (ROI)")
     ax.set_title("5-Year ROI by Field of Study")
     # ax.set_title(
@@ -204,24 +385,135 @@ def plot_roi_by_field(df: pd.DataFrame, output_path: Path):
     ax.legend(loc="upper right")
     ax.grid(axis="x", alpha=0.3)
 
-    plt.tight_layout()
-    plt.savefig(output_path / "roi_by_field.png", dpi=300, bbox_inches="tight")
-    plt.close()
-    print(
-        f"Plot return on investment by field saved: {output_path / 'roi_by_field.png'}"
-    )
+    fig.tight_layout()
+
+    return fig
+
+
+# Per-metric settings for the small-multiples segment plots
+SMALL_MULTIPLES = {
+    "debt_to_income": {
+        "title": "Student Debt Burden by Field of Study (Debt-to-Income Ratio)",
+        "reference_lines": [(1.0, "red")],
+        "cap": None,
+    },
+    "payback_years": {
+        "title": "Years to Pay Off Student Debt",
+        "reference_lines": [(10, "green"), (20, "red")],
+        "cap": 30,
+    },
+}
+
+
+def plot_small_multiples(
+    df: pd.DataFrame,
+    metric: str,
+    segment_col: str,
+    ncols: int = 4,
+    per_figure: int = 12,
+) -> list[Figure]:
+    settings = SMALL_MULTIPLES[metric]
+
+    # Sort and format once for every segment instead of once per figure
+    values = df[metric].clip(upper=settings["cap"])
+    ordered = df.assign(plot_value=values).sort_values([segment_col, "plot_value"])
+    fields = ordered["field"].unique()
+    labels = dict(zip(fields, field_labels(pd.Series(fields))))
+    segments = list(ordered.groupby(segment_col, observed=True, sort=True))
+
+    figures = []
+    for start in range(0, len(segments), per_figure):
+        page = segments[start : start + per_figure]
+        nrows = -(-len(page) // ncols)
+
+        # One figure per page of segments; shared x axes keep a single scale,
+        # locator and formatter for every panel
+        fig = Figure(figsize=(4 * ncols, 3.5 * nrows))
+        axes = fig.subplots(nrows, ncols, sharex=True, squeeze=False).ravel()
+
+        for ax, (segment, group) in zip(axes, page):
+            y = np.arange(len(group))
+            ax.barh(y, group["plot_value"], alpha=0.7, edgecolor="black")
+            for x, color in settings["reference_lines"]:
+                ax.axvline(x=x, color=color, linestyle="--", linewidth=1, alpha=0.5)
+            ax.set_yticks(y, [labels[field] for field in group["field"]], fontsize=7)
+            ax.set_title(str(segment), fontsize=10)
+            ax.grid(axis="x", alpha=0.3)
+
+        for ax in axes[len(page) :]:
+            ax.set_visible(False)
+
+        fig.suptitle(settings["title"])
+        fig.subplots_adjust(wspace=0.6, hspace=0.35)
+        figures.append(fig)
+
+    return figures
+
+
+def generate_segment_plots(
+    df: pd.DataFrame,
+    segment_col: str,
+    output_path: Path = Path("figures"),
+    metrics: tuple[str, ...] = ("debt_to_income", "payback_years"),
+    per_figure: int = 12,
+    renditions: dict[str, dict] = FIGURE_RENDITIONS,
+) -> list[Path]:
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    files = []
+    for metric in metrics:
+        figures = plot_small_multiples(df, metric, segment_col, per_figure=per_figure)
+        for page, fig in enumerate(figures, 1):
+            name = f"{metric}_by_{segment_col.lower().replace(' ', '_')}_{page}"
+            files += save_renditions(fig, output_path, name, renditions)
+
+    print(f"Segment plots saved to: {output_path.absolute()}")
+    return files
 
 
-def generate_all_plots(df: pd.DataFrame, output_path: Path = Path("figures")):
+def generate_all_plots(
+    df: pd.DataFrame,
+    output_path: Path = Path("figures"),
+    max_workers: int = PLOT_MAX_WORKERS,
+    use_cache: bool = True,
+    renditions: dict[str, dict] = FIGURE_RENDITIONS,
+) -> list[Path]:
     output_path.mkdir(parents=True, exist_ok=True)
 
     print("Generating plots...")
     print("=" * 60)
 
-    plot_tuition_vs_earnings(df, output_path)
-    plot_roi_by_field(df, output_path)
-    plot_payback_years(df, output_path)
-    plot_debt_to_income(df, output_path)
+    plotters = [
+        plot_tuition_vs_earnings,
+        plot_roi_by_field,
+        plot_payback_years,
+        plot_debt_to_income,
+    ]
+
+    files = []
+    if max_workers <= 1:
+        for plotter in plotters:
+            files += plotter(df, output_path, use_cache, renditions)
+    else:
+        # Only figures whose inputs changed are sent to the pool
+        stale = []
+        for plotter in plotters:
+            if use_cache and plotter.is_current(df, output_path, renditions):
+                print(f"Plot unchanged, skipping: {plotter.__name__}")
+                files += plotter.files(output_path, renditions)
+            else:
+                stale.append(plotter)
+
+        # Figures are independent, so each renders in its own process
+        if stale:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(plotter, df, output_path, False, renditions)
+                    for plotter in stale
+                ]
+                for future in futures:
+                    files += future.result()
 
     print("=" * 60)
     print(f"All plots saved to: {output_path.absolute()}\n")
+    return files
@@ -3,37 +3,75 @@ import pandas as pd
 from services.configs import (
     CPI_ADJUSTMENT_2018_TO_2024,
     CPI_ADJUSTMENT_2020_TO_2024,
+    CPI_BY_YEAR,
     EARNINGS_FIELD_MAP,
     ENROLLMENTS_FIELD_MAP,
+    TIME_SERIES_COLUMNS,
     TUITION_FIELD_MAP,
 )
 from services.normalization import normalize_field_names, normalize_ref_date
 
 
-def prepare_tuition_data(df: pd.DataFrame) -> pd.DataFrame:
-    normalized = normalize_field_names(df, TUITION_FIELD_MAP)
+def select_latest_year(
+    df: pd.DataFrame, segment_cols: list[str] | None = None
+) -> pd.DataFrame:
+    # Latest year within each segment, so a province whose newest data is a
+    # year behind the others is kept rather than dropped
+    if not segment_cols:
+        return df[df["REF_DATE"] == df["REF_DATE"].max()]
+
+    latest_year = df.groupby(segment_cols, observed=True)["REF_DATE"].transform("max")
+    return df[df["REF_DATE"] == latest_year]
+
+
+def cpi_factor(from_years: pd.Series, to_years: pd.Series) -> pd.Series:
+    cpi = pd.Series(CPI_BY_YEAR)
+    from_years, to_years = from_years.astype(int), to_years.astype(int)
+    missing = set(from_years.unique()) | set(to_years.unique())
+    missing -= set(cpi.index)
+    if missing:
+        raise Exception(f"No CPI value for years: {sorted(missing)}")
+
+    return pd.Series(
+        cpi.loc[to_years].to_numpy() / cpi.loc[from_years].to_numpy(),
+        index=to_years.index,
+    )
+
+
+def prepare_tuition_data(
+    df: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+    all_years: bool = False,
+) -> pd.DataFrame:
+    keys = ["REF_DATE", *(segment_cols or []), "field"]
+
+    normalized = normalize_field_names(df, TUITION_FIELD_MAP, report_unmapped=True)
     normalized = normalize_ref_date(normalized)
 
-    latest_year = normalized["REF_DATE"].max()
-    latest = normalized[normalized["REF_DATE"] == latest_year]
+    latest = normalized if all_years else select_latest_year(normalized, segment_cols)
 
     return (
-        latest.groupby(["REF_DATE", "field"])["VALUE"]
+        latest.groupby(keys)["VALUE"]
         .mean()
         .reset_index()
         .rename(columns={"VALUE": "tuition"})
     )
 
 
-def prepare_earnings_data(df: pd.DataFrame) -> pd.DataFrame:
-    normalized = normalize_field_names(df, EARNINGS_FIELD_MAP)
+def prepare_earnings_data(
+    df: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+    all_years: bool = False,
+) -> pd.DataFrame:
+    keys = ["REF_DATE", *(segment_cols or []), "field"]
+
+    normalized = normalize_field_names(df, EARNINGS_FIELD_MAP, report_unmapped=True)
     normalized = normalize_ref_date(normalized)
 
-    latest_year = normalized["REF_DATE"].max()
-    latest = normalized[normalized["REF_DATE"] == latest_year]
+    latest = normalized if all_years else select_latest_year(normalized, segment_cols)
 
     result = (
-        latest.groupby(["REF_DATE", "field"])["VALUE"]
+        latest.groupby(keys)["VALUE"]
         .mean()
         .reset_index()
         .rename(columns={"VALUE": "earnings_2018"})
@@ -43,55 +81,79 @@ def prepare_earnings_data(df: pd.DataFrame) -> pd.DataFrame:
         result["earnings_2018"] * CPI_ADJUSTMENT_2018_TO_2024
     )
 
-    return result[["REF_DATE", "field", "earnings_2018", "earnings_2024_adjusted"]]
+    return result[[*keys, "earnings_2018", "earnings_2024_adjusted"]]
 
 
-def prepare_enrollment_data(df: pd.DataFrame) -> pd.DataFrame:
-    normalized = normalize_field_names(df, ENROLLMENTS_FIELD_MAP)
+def prepare_enrollment_data(
+    df: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+    all_years: bool = False,
+) -> pd.DataFrame:
+    keys = ["REF_DATE", *(segment_cols or []), "field"]
+
+    normalized = normalize_field_names(df, ENROLLMENTS_FIELD_MAP, report_unmapped=True)
     normalized = normalize_ref_date(normalized)
 
-    latest_year = normalized["REF_DATE"].max()
-    latest = normalized[normalized["REF_DATE"] == latest_year]
+    latest = normalized if all_years else select_latest_year(normalized, segment_cols)
 
     return (
-        latest.groupby(["REF_DATE", "field"])["VALUE"]
+        latest.groupby(keys)["VALUE"]
         .sum()
         .reset_index()
         .rename(columns={"VALUE": "enrollment"})
     )
 
 
-def prepare_debt_data(df: pd.DataFrame) -> pd.DataFrame:
+def prepare_debt_data(
+    df: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+    all_years: bool = False,
+) -> pd.DataFrame:
     df = normalize_ref_date(df)
 
-    latest_year = df["REF_DATE"].max()
-    latest = df[df["REF_DATE"] == latest_year]
-
-    latest = latest[
-        (
-            latest["Statistics"].str.contains(
-                "Average debt owed to the source at graduation"
-            )
-        )
+    df = df[
+        (df["Statistics"].str.contains("Average debt owed to the source at graduation"))
     ]
 
-    latest = latest[
-        latest["Type of debt source"]
+    df = df[
+        df["Type of debt source"]
         == "Graduates who owed money for their education to any source (government or non-government)"
     ]
 
-    latest = latest[["REF_DATE", "VALUE"]].rename(columns={"VALUE": "debt_2018"})
+    latest = df if all_years else select_latest_year(df, segment_cols)
+
+    latest = latest[["REF_DATE", *(segment_cols or []), "VALUE"]].rename(
+        columns={"VALUE": "debt_2018"}
+    )
 
     latest["debt_2024"] = latest["debt_2018"] * CPI_ADJUSTMENT_2020_TO_2024
 
     return latest
 
 
-def estimate_debt_by_fields(avg_debt: float, df_tuition: pd.DataFrame) -> pd.DataFrame:
+def estimate_debt_by_fields(
+    avg_debt: float | pd.Series,
+    df_tuition: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+) -> pd.DataFrame:
     df = df_tuition.copy()
 
-    avg_tuition = df["tuition"].mean()
-    df["estimated_debt"] = (df["tuition"] / avg_tuition) * avg_debt
+    if not segment_cols:
+        avg_tuition = df["tuition"].mean()
+        df["estimated_debt"] = (df["tuition"] / avg_tuition) * avg_debt
+        return df
+
+    # avg_debt is indexed by segment; each segment is scaled by its own averages
+    if avg_debt.index.has_duplicates:
+        duplicated = sorted(set(avg_debt.index[avg_debt.index.duplicated()]))
+        raise Exception(
+            f"Expected one average debt per segment, got duplicates: {duplicated}"
+        )
+    avg_tuition = df.groupby(segment_cols, observed=True)["tuition"].transform("mean")
+    segment_debt = df[segment_cols].merge(
+        avg_debt.rename("avg_debt").reset_index(), on=segment_cols, how="left"
+    )["avg_debt"]
+    df["estimated_debt"] = (df["tuition"] / avg_tuition) * segment_debt.to_numpy()
 
     return df
 
@@ -101,10 +163,76 @@ def merge_dfs(
     df_earnings: pd.DataFrame,
     df_enrollment: pd.DataFrame,
     df_debt: pd.DataFrame,
+    segment_cols: list[str] | None = None,
 ) -> pd.DataFrame:
+    keys = [*(segment_cols or []), "field"]
+
     return (
         df_tuition.drop(columns="REF_DATE")
-        .merge(df_earnings.drop(columns="REF_DATE"), on="field", how="inner")
-        .merge(df_debt.drop(columns=["REF_DATE", "tuition"]), on="field", how="left")
-        .merge(df_enrollment.drop(columns="REF_DATE"), on="field", how="left")
+        .merge(df_earnings.drop(columns="REF_DATE"), on=keys, how="inner")
+        .merge(df_debt.drop(columns=["REF_DATE", "tuition"]), on=keys, how="left")
+        .merge(df_enrollment.drop(columns="REF_DATE"), on=keys, how="left")
     )
+
+
+def merge_time_series(
+    df_tuition: pd.DataFrame,
+    df_earnings: pd.DataFrame,
+    df_enrollment: pd.DataFrame,
+    df_debt: pd.DataFrame,
+    segment_cols: list[str] | None = None,
+) -> pd.DataFrame:
+    # Inputs are prepare_* outputs with all_years=True (df_debt from
+    # prepare_debt_data, not estimate_debt_by_fields). Each tuition year is
+    # paired with the latest earnings and debt surveys at or before it, and
+    # those amounts are CPI-adjusted into that year's dollars, under the
+    # year-neutral TIME_SERIES_COLUMNS names (see calculate_roi_time_series).
+    segment_cols = segment_cols or []
+    keys = [*segment_cols, "field"]
+
+    def as_of(left: pd.DataFrame, right: pd.DataFrame, by: list[str]):
+        right = right.rename(columns={"REF_DATE": "source_year"})
+        # merge_asof needs identical key dtypes; categories differ between tables
+        left = left.astype({col: str for col in by}).sort_values("REF_DATE")
+        right = right.astype({col: str for col in by}).sort_values("source_year")
+        return pd.merge_asof(
+            left,
+            right,
+            left_on="REF_DATE",
+            right_on="source_year",
+            by=by or None,
+            direction="backward",
+        )
+
+    base = df_tuition.astype({col: str for col in keys}).merge(
+        df_enrollment.astype({col: str for col in keys}),
+        on=["REF_DATE", *keys],
+        how="left",
+    )
+
+    earnings = df_earnings[["REF_DATE", *keys, "earnings_2018"]].rename(
+        columns=TIME_SERIES_COLUMNS
+    )
+    base = as_of(base, earnings, keys)
+    base = base.dropna(subset=["earnings_source"])
+    base["earnings_adjusted"] = base["earnings_source"] * cpi_factor(
+        base["source_year"], base["REF_DATE"]
+    )
+    base = base.drop(columns="source_year")
+
+    years = base[["REF_DATE", *segment_cols]].drop_duplicates()
+    debt = df_debt[["REF_DATE", *segment_cols, "debt_2018"]].rename(
+        columns={"debt_2018": "debt_source"}
+    )
+    debt = as_of(years, debt, segment_cols).dropna(subset=["debt_source"])
+    debt["debt_adjusted"] = debt["debt_source"] * cpi_factor(
+        debt["source_year"], debt["REF_DATE"]
+    )
+
+    # Debt is spread across fields within each year (and segment) as usual
+    year_keys = ["REF_DATE", *segment_cols]
+    merged = estimate_debt_by_fields(
+        debt.set_index(year_keys)["debt_adjusted"], base, year_keys
+    ).dropna(subset=["estimated_debt"])
+
+    return merged.set_index(["REF_DATE", *keys]).sort_index()
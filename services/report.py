@@ -1,27 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import json
+from functools import cache
+import math
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from services.configs import (
+    CPI_ADJUSTMENT_2018_TO_2024,
+    CPI_ADJUSTMENT_2020_TO_2024,
+    FIGURE_RENDITIONS,
+    GRACE_PERIOD_YEARS,
+    INCOME_TO_PAYOFF,
+    INTEREST_RATE,
+    RATE_OF_EARNING_GROWTH,
+    REPAYMENT_INCOME_GROWTH,
+    REPORT_MAX_WORKERS,
+    REPORT_TEMPLATE_PATH,
+    TAX_RATE,
+    YEARS_OF_TUITION,
+)
+from services.plots import rendition_files
+
+# Rankings shown in the report: (key, column, ascending)
+RANKINGS = [
+    ("by_5yr_roi", "roi_5yr_w_tuition", False),
+    ("by_earnings_per_dollar", "earnings_per_dollar_tuition", False),
+    ("by_debt_to_income", "debt_to_income", True),
+    ("by_payback_period", "payback_years", True),
+]
+
+
+@cache
+def load_template(name: str):
+    # Templates are read once per process and kept as their bound format_map,
+    # so rendering a section or row is a single call on a dict of values
+    return (REPORT_TEMPLATE_PATH / f"{name}.md").read_text().format_map
+
+
+def render_rows(name: str, rows: list[dict]) -> str:
+    return "".join(map(load_template(name), rows))
+
+
+def build_report_context(df: pd.DataFrame) -> dict:
+    # Every sort, mean, quantile and ranking the sections need, computed once.
+    # Rows are converted once to records of native Python values so sections
+    # can format them and dump them to JSON directly; every ordering below is
+    # a list of references into those same records
+    rows = df.reset_index(drop=True)
+    rows["field_name"] = rows["field"].str.replace("_", " ").str.title()
+
+    means = df[
+        [
+            "tuition",
+            "estimated_debt",
+            "earnings_2024_adjusted",
+            "roi_5yr_w_tuition",
+            "earnings_per_dollar_tuition",
+            "payback_years",
+        ]
+    ].mean()
+    median_roi = df["roi_5yr_w_tuition"].median()
+    median_enrollment = df["enrollment"].median()
 
-def generate_summary(df: pd.DataFrame, path: Path = Path("reports")) -> str:
-    avg_tuition = df["tuition"].mean()
-    avg_debt = df["estimated_debt"].mean()
-    avg_earnings = df["earnings_2024_adjusted"].mean()
-    avg_roi = df["roi_5yr_w_tuition"].mean()
-    avg_payback = df["payback_years"].mean()
+    rows["roi_comparison"] = np.where(
+        rows["roi_5yr_w_tuition"] > means["roi_5yr_w_tuition"], "above", "below"
+    )
+    rows["value_comparison"] = np.where(
+        rows["earnings_per_dollar_tuition"] > means["earnings_per_dollar_tuition"],
+        "above",
+        "below",
+    )
 
-    best_roi = df.loc[df["roi_5yr_w_tuition"].idxmax()]
-    worst_roi = df.loc[df["roi_5yr_w_tuition"].idxmin()]
+    all_records = rows.to_dict("records")
 
-    best_value = df.loc[df["earnings_per_dollar_tuition"].idxmax()]
-    worst_value = df.loc[df["earnings_per_dollar_tuition"].idxmin()]
+    def records(frame: pd.DataFrame) -> list[dict]:
+        return [all_records[position] for position in frame.index]
 
-    fastest_payback = df.loc[df["payback_years"].idxmin()]
-    slowest_payback = df.loc[df["payback_years"].idxmax()]
+    def row(position: int) -> dict:
+        return all_records[position]
 
-    summary_data = {
+    by_roi = rows.sort_values("roi_5yr_w_tuition", ascending=False)
+
+    high_enroll_low_roi = rows[
+        (rows["enrollment"] > median_enrollment)
+        & (rows["roi_5yr_w_tuition"] < median_roi)
+    ].sort_values("enrollment", ascending=False)
+    high_debt_burden = rows[rows["debt_to_income"] > 1.0].sort_values(
+        "debt_to_income", ascending=False
+    )
+    best_practices = by_roi[
+        (by_roi["roi_5yr_w_tuition"] > df["roi_5yr_w_tuition"].quantile(0.75))
+        & (by_roi["debt_to_income"] < df["debt_to_income"].quantile(0.5))
+    ]
+
+    return {
         "report_date": datetime.now().strftime("%B %d, %Y"),
+        "means": means.to_dict(),
+        "by_roi_frame": by_roi.drop(
+            columns=["field_name", "roi_comparison", "value_comparison"]
+        ),
+        "by_roi": records(by_roi),
+        "rankings": {
+            key: records(rows.sort_values(column, ascending=ascending))
+            for key, column, ascending in RANKINGS
+        },
+        "best_roi": row(rows["roi_5yr_w_tuition"].idxmax()),
+        "worst_roi": row(rows["roi_5yr_w_tuition"].idxmin()),
+        "best_value": row(rows["earnings_per_dollar_tuition"].idxmax()),
+        "worst_value": row(rows["earnings_per_dollar_tuition"].idxmin()),
+        "fastest_payback": row(rows["payback_years"].idxmin()),
+        "slowest_payback": row(rows["payback_years"].idxmax()),
+        "high_enrollment_low_roi": records(high_enroll_low_roi),
+        "high_debt_burden": records(high_debt_burden),
+        "best_practices": records(best_practices),
+    }
+
+
+def generate_summary(context: dict, artifacts: dict) -> str:
+    means = context["means"]
+    avg_tuition = means["tuition"]
+    avg_debt = means["estimated_debt"]
+    avg_earnings = means["earnings_2024_adjusted"]
+    avg_roi = means["roi_5yr_w_tuition"]
+    avg_payback = means["payback_years"]
+
+    best_roi = context["best_roi"]
+    worst_roi = context["worst_roi"]
+
+    best_value = context["best_value"]
+    worst_value = context["worst_value"]
+
+    fastest_payback = context["fastest_payback"]
+    slowest_payback = context["slowest_payback"]
+
+    summary_data = {
+        "report_date": context["report_date"],
         "overall_averages": {
             "avg_annual_tuition": avg_tuition,
             "avg_total_debt": avg_debt,
@@ -69,276 +184,132 @@ def generate_summary(df: pd.DataFrame, path: Path = Path("reports")) -> str:
         },
     }
 
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "summary.json"
-    with open(json_path, "w") as f:
-        json.dump(summary_data, f, indent=4)
-
-    summary = f"""
-# Canadian University Education ROI Analysis
-
-**Report Date:** {datetime.now().strftime("%B %d, %Y")}
-
-## Visual Overview
-
-This report includes the following data visualizations (see `figures/` directory):
-
-1. **Tuition vs Earnings Chart** - Shows relationship between tuition costs and earnings (after 2 years)
-2. **ROI Comparison by Field** - Side-by-side comparison of ROI of all fields
-3. **Payback Period by Field** - Shows years required to repay debt at 10% of post-tax income
-4. **Debt-to-Income Ratio Rankings** - Visualizes repayment burden across fields
-
-## Key Findings
-
-### Overall
-- **Average Annual Tuition:** ${avg_tuition:,.0f}
-- **Average Total Debt:** ${avg_debt:,.0f}
-- **Average Earnings (Year 2):** ${avg_earnings:,.0f}
-- **Average 5-Year ROI:** {avg_roi:.2f}x
-- **Average Payback Period:** {avg_payback:.1f} years
-
-### Best Performing Fields
-
-**Highest ROI:** {best_roi["field"].replace("_", " ").title()}
-- 5-Year ROI: {best_roi["roi_5yr_w_tuition"]:.2f}x
-- Annual Tuition: ${best_roi["tuition"]:,.0f}
-- Median Earnings: ${best_roi["earnings_2024_adjusted"]:,.0f}
-
-**Best Value for Money:** {best_value["field"].replace("_", " ").title()}
-- Earnings per Dollar: ${best_value["earnings_per_dollar_tuition"]:.2f}
-- Annual Tuition: ${best_value["tuition"]:,.0f}
-- Median Earnings: ${best_value["earnings_2024_adjusted"]:,.0f}
-
-**Fastest Debt Payback:** {fastest_payback["field"].replace("_", " ").title()}
-- Payback Period: {fastest_payback["payback_years"]:.1f} years
-- Debt-to-Income: {fastest_payback["debt_to_income"]:.2f}x
-
-### Areas of Concern
-
-**Lowest ROI:** {worst_roi["field"].replace("_", " ").title()}
-- 5-Year ROI: {worst_roi["roi_5yr_w_tuition"]:.2f}x
-- Annual Tuition: ${worst_roi["tuition"]:,.0f}
-- Median Earnings: ${worst_roi["earnings_2024_adjusted"]:,.0f}
-
-**Lowest Value for Money:** {worst_value["field"].replace("_", " ").title()}
-- Earnings per Dollar: ${worst_value["earnings_per_dollar_tuition"]:.2f}
-- Annual Tuition: ${worst_value["tuition"]:,.0f}
-- Median Earnings: ${worst_value["earnings_2024_adjusted"]:,.0f}
-
-**Slowest Debt Payback:** {slowest_payback["field"].replace("_", " ").title()}
-- Payback Period: {slowest_payback["payback_years"]:.1f} years
-- Debt-to-Income: {slowest_payback["debt_to_income"]:.2f}x
-
----
-"""
-    return summary
+    artifacts["summary.json"] = summary_data
+
+    return load_template("summary")(
+        {
+            "report_date": context["report_date"],
+            "avg_tuition": avg_tuition,
+            "avg_debt": avg_debt,
+            "avg_earnings": avg_earnings,
+            "avg_roi": avg_roi,
+            "avg_payback": avg_payback,
+            "best_roi": best_roi,
+            "best_value": best_value,
+            "fastest_payback": fastest_payback,
+            "worst_roi": worst_roi,
+            "worst_value": worst_value,
+            "slowest_payback": slowest_payback,
+        }
+    )
 
 
-def generate_field_rankings(df: pd.DataFrame, path: Path = Path("reports")) -> str:
-    rankings_data = {
-        "by_5yr_roi": [],
-        "by_earnings_per_dollar": [],
-        "by_debt_to_income": [],
-        "by_payback_period": [],
+def generate_field_rankings(context: dict, artifacts: dict) -> str:
+    headings = {
+        "by_5yr_roi": "By 5-Year ROI (Tuition-Based)",
+        "by_earnings_per_dollar": "By Earnings per Dollar of Tuition",
+        "by_debt_to_income": "By Debt-to-Income Ratio (Lower is Better)",
+        "by_payback_period": "By Payback Period (Faster is Better)",
+    }
+    formats = {
+        "by_5yr_roi": "{:.2f}x",
+        "by_earnings_per_dollar": "${:.2f}",
+        "by_debt_to_income": "{:.2f}x",
+        "by_payback_period": "{:.1f} years",
     }
 
-    rankings = """
-## Field Rankings
-
-### By 5-Year ROI (Tuition-Based)
-"""
-    roi_ranked = df.sort_values("roi_5yr_w_tuition", ascending=False)
-    for i, (idx, row) in enumerate(roi_ranked.iterrows(), 1):
-        rankings += f"{i}. **{row['field'].replace('_', ' ').title()}** - {row['roi_5yr_w_tuition']:.2f}x\n"
-        rankings_data["by_5yr_roi"].append(
-            {"rank": i, "field": row["field"], "value": row["roi_5yr_w_tuition"]}
-        )
+    rankings_data = {}
+    sections = []
+    for key, column, _ in RANKINGS:
+        ranked = context["rankings"][key]
+        rankings_data[key] = [
+            {"rank": i, "field": row["field"], "value": row[column]}
+            for i, row in enumerate(ranked, 1)
+        ]
 
-    rankings += """
-### By Earnings per Dollar of Tuition
-"""
-    value_ranked = df.sort_values("earnings_per_dollar_tuition", ascending=False)
-    for i, (idx, row) in enumerate(value_ranked.iterrows(), 1):
-        rankings += f"{i}. **{row['field'].replace('_', ' ').title()}** - ${row['earnings_per_dollar_tuition']:.2f}\n"
-        rankings_data["by_earnings_per_dollar"].append(
+        rows = [
             {
                 "rank": i,
-                "field": row["field"],
-                "value": row["earnings_per_dollar_tuition"],
+                "field_name": row["field_name"],
+                "value": formats[key].format(row[column]),
             }
+            for i, row in enumerate(ranked, 1)
+        ]
+        sections.append(
+            load_template("ranking")(
+                {"heading": headings[key], "rows": render_rows("row_ranking", rows)}
+            )
         )
 
-    rankings += """
-### By Debt-to-Income Ratio (Lower is Better)
-"""
-    debt_ranked = df.sort_values("debt_to_income", ascending=True)
-    for i, (idx, row) in enumerate(debt_ranked.iterrows(), 1):
-        rankings += f"{i}. **{row['field'].replace('_', ' ').title()}** - {row['debt_to_income']:.2f}x\n"
-        rankings_data["by_debt_to_income"].append(
-            {"rank": i, "field": row["field"], "value": row["debt_to_income"]}
-        )
-
-    rankings += """
-### By Payback Period (Faster is Better)
-"""
-    payback_ranked = df.sort_values("payback_years", ascending=True)
-    for i, (idx, row) in enumerate(payback_ranked.iterrows(), 1):
-        rankings += f"{i}. **{row['field'].replace('_', ' ').title()}** - {row['payback_years']:.1f} years\n"
-        rankings_data["by_payback_period"].append(
-            {"rank": i, "field": row["field"], "value": row["payback_years"]}
-        )
-    rankings += "\n---\n"
-
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "rankings.json"
-    with open(json_path, "w") as f:
-        json.dump(rankings_data, f, indent=4)
-
-    return rankings
-
-
-def generate_table(df: pd.DataFrame, path: Path = Path("reports")) -> str:
-    # Sort by ROI for table presentation
-    df_sorted = df.sort_values("roi_5yr_w_tuition", ascending=False).copy()
-    path.mkdir(parents=True, exist_ok=True)
-    csv_path = path / "roi_table.csv"
-    df_sorted.to_csv(csv_path, index=False)
-
-    table = """
-## Data Table
-
-| Field | Annual Tuition | Total Debt | Earnings (Yr 2) | ROI (Tuition) | ROI (Debt) | Debt-to-Income | Payback Years | Earnings/$ Tuition | Enrollment |
-|-------|----------------|------------|-----------------|---------------|------------|----------------|---------------|-------------------|------------|
-"""
-
-    for idx, row in df_sorted.iterrows():
-        field_name = row["field"].replace("_", " ").title()
-        table += f"| {field_name} | ${row['tuition']:,.0f} | ${row['estimated_debt']:,.0f} | ${row['earnings_2024_adjusted']:,.0f} | {row['roi_5yr_w_tuition']:.2f}x | {row['roi_5yr_w_debt']:.2f}x | {row['debt_to_income']:.2f}x | {row['payback_years']:.1f} yrs | ${row['earnings_per_dollar_tuition']:.2f} | {row['enrollment']:,.0f} |\n"
-
-    table += """
----
-"""
-    return table
-
-
-def generate_visualizations(df: pd.DataFrame, path: Path = Path("reports")) -> str:
+    artifacts["rankings.json"] = rankings_data
+
+    return load_template("rankings")({"rankings": "".join(sections)})
+
+
+def generate_table(context: dict, artifacts: dict) -> str:
+    # Sorted by ROI for table presentation
+    artifacts["roi_table.csv"] = context["by_roi_frame"].to_csv(index=False)
+
+    return load_template("table")({"rows": render_rows("row_table", context["by_roi"])})
+
+
+def figure_renditions(name: str) -> dict[str, str]:
+    # Filename of each saved rendition of a figure, keyed by rendition name
+    files = rendition_files(Path(), name, FIGURE_RENDITIONS)
+    return {rendition: f.name for rendition, f in zip(FIGURE_RENDITIONS, files)}
+
+
+def generate_visualizations(context: dict, artifacts: dict) -> str:
+    figures = [
+        (
+            "Tuition vs Earnings Chart",
+            "tuition_vs_earnings",
+            "Shows the relationship between total 4-year tuition costs and median earnings 2 years after graduation",
+        ),
+        (
+            "ROI Comparison by Field",
+            "roi_by_field",
+            "Side-by-side comparison showing 5-year ROI calculated based on tuition and debt",
+        ),
+        (
+            "Payback Period by Field",
+            "payback_years",
+            "Estimated years to repay student debt assuming 25% tax rate and 10% of post-tax income to debt repayment",
+        ),
+        (
+            "Debt-to-Income Ratio Rankings",
+            "debt_to_income_ratio",
+            "Horizontal bar chart showing estimated debt as a multiple of annual earnings",
+        ),
+    ]
+    renditions = {figure: figure_renditions(figure) for _, figure, _ in figures}
+
+    # filename stays the print rendition; pages should show renditions["web"]
     viz_data = {
         "visualizations": [
             {
-                "name": "Tuition vs Earnings Chart",
-                "filename": "tuition_vs_earnings.png",
-                "description": "Shows the relationship between total 4-year tuition costs and median earnings 2 years after graduation",
-            },
-            {
-                "name": "ROI Comparison by Field",
-                "filename": "roi_by_field.png",
-                "description": "Side-by-side comparison showing 5-year ROI calculated based on tuition and debt",
-            },
-            {
-                "name": "Payback Period by Field",
-                "filename": "payback_years.png",
-                "description": "Estimated years to repay student debt assuming 25% tax rate and 10% of post-tax income to debt repayment",
-            },
-            {
-                "name": "Debt-to-Income Ratio Rankings",
-                "filename": "debt_to_income_ratio.png",
-                "description": "Horizontal bar chart showing estimated debt as a multiple of annual earnings",
-            },
+                "name": name,
+                "filename": renditions[figure]["print"],
+                "renditions": renditions[figure],
+                "description": description,
+            }
+            for name, figure, description in figures
         ]
     }
 
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "visualizations.json"
-    with open(json_path, "w") as f:
-        json.dump(viz_data, f, indent=4)
-
-    visualization = """
-## Data Visualizations
-
-This report is accompanied by four key visualizations located in the `figures/` directory. Each visualization highlights different aspects of the ROI analysis:
-
-### 1. Tuition vs Earnings Chart
-**File:** `figures/tuition_vs_earnings.png`
+    artifacts["visualizations.json"] = viz_data
 
-Shows the relationship between total 4-year tuition costs and median earnings 2 years after graduation:
-- Whether higher tuition translates to higher earnings
-- Outliers in either direction (high cost/low earnings or low cost/high earnings)
+    return load_template("visualizations")(renditions)
 
-![tuition_vs_earnings](../figures/tuition_vs_earnings.png)
 
-**Key Insight:** Some of the lowest-tuition fields produce competitive earnings, suggesting strong value for students.
-
----
-
-### 2. ROI Comparison by Field
-**File:** `figures/roi_by_field.png`
-
-Side-by-side comparison showing 5-year ROI calculated two ways:
-- Based on total tuition paid
-- Based on estimated debt incurred
-
-Includes average ROI lines for both calculations. The gap between the two bars shows how debt burden affects returns.
-
-![roi_by_field](../figures/roi_by_field.png)
-
-**Key Insight:** Fields where debt-based ROI is significantly lower than tuition-based ROI indicate students are over-borrowing relative to costs.
-
----
-
-### 3. Payback Period by Field
-**File:** `figures/payback_years.png`
-
-Shows estimated years to repay student debt assuming 25% tax rate on income and 10% of post-tax income goes to debt repayment. Converts abstract debt figures into time, which is more intuitive for students and families.
-
-![payback_years](../figures/payback_years.png)
-
-**Key Insight:** Fields requiring 15+ years for debt repayment may discourage students despite long-term career potential.
-
----
-
-### 4. Debt-to-Income Ratio Rankings
-**File:** `figures/debt_to_income_ratio.png`
-
-Horizontal bar chart showing estimated debt as a multiple of annual earnings. A ratio above 1.0 means debt exceeds annual income. Lower is better.
-
-![debt_to_income](../figures/debt_to_income_ratio.png)
-
-**Key Insight:** Fields with ratios above 1.2x may face significant repayment stress and warrant financial aid attention.
-
----
-"""
-    return visualization
-
-
-def generate_analysis(df: pd.DataFrame, path: Path = Path("reports")) -> str:
-    df_sorted = df.sort_values("roi_5yr_w_tuition", ascending=False)
+def generate_analysis(context: dict, artifacts: dict) -> str:
     analysis_data = {"fields": []}
 
-    analysis = """
-## Field Analysis
-
-"""
-
-    for idx, row in df_sorted.iterrows():
-        field_name = row["field"].replace("_", " ").title()
-
-        # Determine if above/below average
-        roi_comparison = (
-            "above"
-            if row["roi_5yr_w_tuition"] > df["roi_5yr_w_tuition"].mean()
-            else "below"
-        )
-        value_comparison = (
-            "above"
-            if row["earnings_per_dollar_tuition"]
-            > df["earnings_per_dollar_tuition"].mean()
-            else "below"
-        )
-
+    for row in context["by_roi"]:
         analysis_data["fields"].append(
             {
                 "field": row["field"],
-                "field_display_name": field_name,
+                "field_display_name": row["field_name"],
                 "financial_metrics": {
                     "annual_tuition": row["tuition"],
                     "total_4yr_tuition": row["total_tuition"],
@@ -347,9 +318,9 @@ def generate_analysis(df: pd.DataFrame, path: Path = Path("reports")) -> str:
                 },
                 "roi_metrics": {
                     "earnings_per_dollar_tuition": row["earnings_per_dollar_tuition"],
-                    "earnings_per_dollar_comparison": value_comparison,
+                    "earnings_per_dollar_comparison": row["value_comparison"],
                     "roi_5yr_tuition": row["roi_5yr_w_tuition"],
-                    "roi_tuition_comparison": roi_comparison,
+                    "roi_tuition_comparison": row["roi_comparison"],
                     "roi_5yr_debt": row["roi_5yr_w_debt"],
                 },
                 "debt_burden": {
@@ -360,53 +331,13 @@ def generate_analysis(df: pd.DataFrame, path: Path = Path("reports")) -> str:
             }
         )
 
-        analysis += f"""
-### {field_name}
-
-**Financial Metrics:**
-- Annual Tuition: ${row["tuition"]:,.0f}
-- Total 4-Year Tuition: ${row["total_tuition"]:,.0f}
-- Estimated Debt: ${row["estimated_debt"]:,.0f}
-- Median Earnings (Year 2): ${row["earnings_2024_adjusted"]:,.0f}
-
-**Return on Investment:**
-- Earnings per Dollar of Tuition: ${row["earnings_per_dollar_tuition"]:.2f} ({value_comparison} average)
-- 5-Year ROI (Tuition): {row["roi_5yr_w_tuition"]:.2f}x ({roi_comparison} average)
-- 5-Year ROI (Debt): {row["roi_5yr_w_debt"]:.2f}x
+    artifacts["analysis.json"] = analysis_data
 
-**Debt Burden:**
-- Debt-to-Income Ratio: {row["debt_to_income"]:.2f}x
-- Estimated Payback Period: {row["payback_years"]:.1f} years
+    fields = render_rows("field_analysis", context["by_roi"])
+    return load_template("analysis")({"fields": fields})
 
-**Enrollment:** {row["enrollment"]:,.0f} students
-
----
-"""
-
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "analysis.json"
-    with open(json_path, "w") as f:
-        json.dump(analysis_data, f, indent=4)
-
-    return analysis
-
-
-def generate_policy_recommendations(
-    df: pd.DataFrame, path: Path = Path("reports")
-) -> str:
-    # Identify high-enrollment, low-ROI fields
-    median_roi = df["roi_5yr_w_tuition"].median()
-    median_enrollment = df["enrollment"].median()
-
-    high_enroll_low_roi = df[
-        (df["enrollment"] > median_enrollment) & (df["roi_5yr_w_tuition"] < median_roi)
-    ].sort_values("enrollment", ascending=False)
-
-    # Identify high debt burden fields
-    high_debt_burden = df[df["debt_to_income"] > 1.0].sort_values(
-        "debt_to_income", ascending=False
-    )
 
+def generate_policy_recommendations(context: dict, artifacts: dict) -> str:
     policy_data = {
         "areas_requiring_attention": {
             "high_enrollment_low_roi": [],
@@ -435,17 +366,7 @@ def generate_policy_recommendations(
         },
     }
 
-    recommendations = """
-## Policy Recommendations
-
-### Areas Requiring Attention
-
-#### High Enrollment, Low ROI Fields
-These fields serve many students but show below-median returns:
-
-"""
-    for idx, row in high_enroll_low_roi.iterrows():
-        recommendations += f"- **{row['field'].replace('_', ' ').title()}**: {row['enrollment']:,.0f} students, ROI {row['roi_5yr_w_tuition']:.2f}x\n"
+    for row in context["high_enrollment_low_roi"]:
         policy_data["areas_requiring_attention"]["high_enrollment_low_roi"].append(
             {
                 "field": row["field"],
@@ -454,17 +375,7 @@ These fields serve many students but show below-median returns:
             }
         )
 
-    recommendations += """
-**Recommendations:**
-- Review tuition pricing structures for these programs
-- Enhance career counseling and job placement services
-- Consider industry partnerships to improve employment outcomes
-- Develop financial literacy programs for students in these fields
-
-#### High Debt Burden Fields
-"""
-    for idx, row in high_debt_burden.iterrows():
-        recommendations += f"- **{row['field'].replace('_', ' ').title()}**: Debt-to-Income {row['debt_to_income']:.2f}x, Payback {row['payback_years']:.1f} years\n"
+    for row in context["high_debt_burden"]:
         policy_data["areas_requiring_attention"]["high_debt_burden"].append(
             {
                 "field": row["field"],
@@ -473,25 +384,7 @@ These fields serve many students but show below-median returns:
             }
         )
 
-    recommendations += """
-**Recommendations:**
-- Expand scholarship and grant programs for these fields
-- Review whether tuition costs are justified by earnings potential
-- Consider capping debt levels for students in these programs
-
-### Best Practices to Expand
-
-#### High-Performing Models
-Fields showing strong ROI and reasonable debt burdens can serve as models:
-
-"""
-    best_practices = df[
-        (df["roi_5yr_w_tuition"] > df["roi_5yr_w_tuition"].quantile(0.75))
-        & (df["debt_to_income"] < df["debt_to_income"].quantile(0.5))
-    ].sort_values("roi_5yr_w_tuition", ascending=False)
-
-    for idx, row in best_practices.iterrows():
-        recommendations += f"- **{row['field'].replace('_', ' ').title()}**: ROI {row['roi_5yr_w_tuition']:.2f}x, Debt-to-Income {row['debt_to_income']:.2f}x\n"
+    for row in context["best_practices"]:
         policy_data["best_practices"].append(
             {
                 "field": row["field"],
@@ -500,31 +393,52 @@ Fields showing strong ROI and reasonable debt burdens can serve as models:
             }
         )
 
-    recommendations += """
-**Recommendations:**
-- Study successful curriculum and industry partnership models
-- Promote these fields to students considering post-secondary education
+    artifacts["policy_recommendations.json"] = policy_data
+
+    return load_template("policy_recommendations")(
+        {
+            "high_enrollment_low_roi": render_rows(
+                "row_high_enrollment_low_roi", context["high_enrollment_low_roi"]
+            ),
+            "high_debt_burden": render_rows(
+                "row_high_debt_burden", context["high_debt_burden"]
+            ),
+            "best_practices": render_rows(
+                "row_best_practice", context["best_practices"]
+            ),
+        }
+    )
 
-### System-Wide Improvements
 
-1. **Transparency:** Provide prospective students with clear ROI data before enrollment
-2. **Affordability:** Review tuition increases relative to earnings outcomes
-3. **Accountability:** Track and publish graduate outcomes by program
-4. **Support:** Enhance financial aid for high-social-value, lower-earning fields
-5. **Flexibility:** Develop more affordable pathway options (e.g., co-op, apprenticeship models)
+def percent(rate: float) -> str:
+    return f"{rate * 100:g}%"
 
----
-"""
 
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "policy_recommendations.json"
-    with open(json_path, "w") as f:
-        json.dump(policy_data, f, indent=2)
+def payback_terms() -> tuple[str, str]:
+    # (loan terms, payback formula) as configured, for the methodology section
+    if INTEREST_RATE == 0 and GRACE_PERIOD_YEARS == 0 and REPAYMENT_INCOME_GROWTH == 1:
+        return (
+            "No interest on debt (simplified)",
+            "debt / (post_tax_income * repayment_percentage)",
+        )
 
-    return recommendations
+    terms = (
+        f"Interest at {percent(INTEREST_RATE)} a year from graduation, "
+        f"{GRACE_PERIOD_YEARS}-year grace period before repayment starts, "
+        f"payments growing {percent(REPAYMENT_INCOME_GROWTH - 1)} a year with income"
+    )
+    formula = (
+        "grace_years + ln(1 - B * (1 + r) / P * (1 - g / (1 + r))) / ln(g / (1 + r)), "
+        "where B = debt * (1 + r)^grace_years, "
+        "P = post_tax_income * repayment_percentage * g^grace_years, "
+        "r = interest rate and g = yearly payment growth "
+        "(grace_years + B * (1 + r) / P when g = 1 + r; never repaid when the log is undefined)"
+    )
+    return terms, formula
 
 
-def generate_methodology(df: pd.DataFrame, path: Path = Path("reports")) -> str:
+def generate_methodology(context: dict, artifacts: dict) -> str:
+    loan_terms, payback_formula = payback_terms()
     methodology_data = {
         "data_sources": [
             "Table 37-10-0003-01: Canadian undergraduate tuition fees by field of study",
@@ -534,25 +448,27 @@ def generate_methodology(df: pd.DataFrame, path: Path = Path("reports")) -> str:
         ],
         "assumptions": {
             "inflation_adjustment": {
-                "cpi_2018_to_2024": 1.21,
-                "cpi_2020_to_2024": 1.14,
+                "cpi_2018_to_2024": CPI_ADJUSTMENT_2018_TO_2024,
+                "cpi_2020_to_2024": CPI_ADJUSTMENT_2020_TO_2024,
             },
             "debt_estimation": {
                 "method": "Proportional to tuition costs",
                 "formula": "(tuition_for_field / avg_tuition) * avg_national_debt",
-                "program_length": "4 years",
+                "program_length": f"{YEARS_OF_TUITION} years",
             },
             "roi_calculation": {
-                "earnings_growth": 0.03,
+                "earnings_growth": round(RATE_OF_EARNING_GROWTH - 1, 6),
                 "base_period": "2 years post-graduation",
                 "tuition_roi_formula": "(5yr_cumulative_earnings - total_tuition) / total_tuition",
                 "debt_roi_formula": "(5yr_cumulative_earnings - estimated_debt) / estimated_debt",
             },
             "payback_calculation": {
-                "income_to_debt_repayment": 0.10,
-                "tax_rate": 0.25,
-                "interest_rate": 0.0,
-                "formula": "debt / (post_tax_income * repayment_percentage)",
+                "income_to_debt_repayment": INCOME_TO_PAYOFF,
+                "tax_rate": TAX_RATE,
+                "interest_rate": INTEREST_RATE,
+                "grace_period_years": GRACE_PERIOD_YEARS,
+                "repayment_income_growth": REPAYMENT_INCOME_GROWTH,
+                "formula": payback_formula,
             },
             "earnings_per_dollar": {
                 "formula": "median_annual_earnings_year2 / total_4yr_tuition"
@@ -575,99 +491,143 @@ def generate_methodology(df: pd.DataFrame, path: Path = Path("reports")) -> str:
         },
     }
 
-    path.mkdir(parents=True, exist_ok=True)
-    json_path = path / "methodology.json"
-    with open(json_path, "w") as f:
-        json.dump(methodology_data, f, indent=2)
-
-    methodology = """
-## Methodology & Assumptions
-
-### Data Sources
-All data sourced from Statistics Canada tables:
-- **Table 37-10-0003-01:** Canadian undergraduate tuition fees by field of study (current dollars)
-- **Table 37-10-0280-01:** Characteristics and median employment income of longitudinal cohorts of postsecondary graduates two and five years after graduation, by educational qualification and field of study (alternative primary groupings)
-- **Table 37-10-0011-01:** Postsecondary enrolments, by field of study, registration status, program type, credential type and gender
-- **Table 37-10-0036-01:** Student debt from all sources, by province of study and level of study
-
-### Key Assumptions
-
-#### Inflation Adjustment
-- CPI adjustment (2018 to 2024): 1.21
-- CPI adjustment (2020 to 2024): 1.14
-
-#### Debt Estimation
-- Average national debt used as baseline
-- Debt estimated for each field proportional to tuition costs
-    - **Debt for Field:** (tuition cost for field / average tuition cost) * average national debt
-- Assumes standard 4-year undergraduate program
-
-#### ROI Calculation
-- Amount earned over 5 years (minus tuition costs) compared to amount paid for tuition
-- Assumes 3% annual earnings growth
-- Based on median earnings 2 years post-graduation
-- **5-Year ROI (Tuition):** (5-year cumulative earnings - total tuition) / total tuition
-- **5-Year ROI (Debt):** (5-year cumulative earnings - estimated debt) / estimated debt
-
-#### Payback Period Calculation
-- Assumes 10% of post-tax income dedicated to debt repayment
-- Tax rate assumed at 25%
-- No interest on debt (simplified)
-- **Post-tax Income:** median earnings * (1 - tax-rate) [tax rate assumed to be 25%]
-- **Payback Years:** debt for field / (post-tax income * % of income to debt repayment) [% to debt repayment assumed to be 10%]
-
-#### Earnings per Dollar
-- Shows immediate earning potential relative to investment
-- **Earnings per Dollar:** median annual earnings (year 2) / total 4-year tuition
-
-### Limitations
-- Earnings data represents median, not mean (outliers not reflected)
-- Does not account for:
-  - Regional variation in tuition or earnings
-  - Graduate vs undergraduate distinctions in some fields
-  - Scholarships, grants, or other financial aid
-  - Career progression beyond Year 2
-  - Job market saturation or demand
-  - Individual career choices and performance
-
-### Data Years
-- Tuition: 2023/2024 academic year
-- Earnings: 2018 (inflation-adjusted to 2024)
-- Enrollment: 2023/2024 academic year
-- Debt: 2020 (inflation-adjusted to 2024)
-
----
-"""
-    return methodology
-
-
-def generate_report(df: pd.DataFrame, path: Path = Path("reports")) -> None:
-    path.mkdir(parents=True, exist_ok=True)
+    artifacts["methodology.json"] = methodology_data
+
+    return load_template("methodology")(
+        {
+            "cpi_2018_to_2024": CPI_ADJUSTMENT_2018_TO_2024,
+            "cpi_2020_to_2024": CPI_ADJUSTMENT_2020_TO_2024,
+            "years_of_tuition": YEARS_OF_TUITION,
+            "earnings_growth": percent(RATE_OF_EARNING_GROWTH - 1),
+            "repayment_share": percent(INCOME_TO_PAYOFF),
+            "tax_rate": percent(TAX_RATE),
+            "loan_terms": loan_terms,
+            "payback_formula": payback_formula,
+        }
+    )
 
-    print("Generating report...")
 
-    report = ""
-    report += generate_summary(df)
-    report += generate_field_rankings(df)
-    report += generate_table(df)
-    report += generate_visualizations(df)
-    report += generate_analysis(df)
-    report += generate_methodology(df)
-    report += generate_policy_recommendations(df)
+# Report sections in order: (template placeholder, builder)
+SECTIONS = [
+    ("summary", generate_summary),
+    ("rankings", generate_field_rankings),
+    ("table", generate_table),
+    ("visualizations", generate_visualizations),
+    ("analysis", generate_analysis),
+    ("methodology", generate_methodology),
+    ("policy_recommendations", generate_policy_recommendations),
+]
+
+
+def build_section(builder, context: dict) -> tuple[str, dict]:
+    # Sections only read the shared context, so each can run in its own worker
+    # and hand back its Markdown together with the artifacts it produced
+    artifacts = {}
+    return builder(context, artifacts), artifacts
+
+
+# Context handed to each report worker once, when the pool starts (inherited
+# without pickling under fork), rather than with every submitted section
+worker_context = None
+
+
+def init_section_worker(context: dict) -> None:
+    global worker_context
+    worker_context = context
+
 
-    # Add footer
-    report += f"""
----
+def build_worker_section(builder) -> tuple[str, dict]:
+    return build_section(builder, worker_context)
 
-**Report Generated:** {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
 
-**Data Sources:** Statistics Canada Tables 37-10-0003-01, 37-10-0280-01, 37-10-0011-01, 37-10-0036-01
+def json_safe(value):
+    # NaN and inf (e.g. payback when the debt is never repaid) become null:
+    # the stdlib would write NaN/Infinity, which is not valid JSON
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return json_safe(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
 
-For questions or additional analysis, please refer to the accompanying visualizations and raw data files.
-"""
 
-    report_path = path / "REPORT.md"
-    with open(report_path, "w") as f:
-        f.write(report)
+def encode_json(data, compact: bool = False) -> bytes:
+    data = json_safe(data)
+    if compact:
+        return json.dumps(data, separators=(",", ":"), allow_nan=False).encode()
+    return json.dumps(data, indent=2, allow_nan=False).encode()
+
+
+def write_artifacts(artifacts: dict, path: Path, compact: bool = False) -> list[Path]:
+    # Everything is encoded and written to temp files first, then renamed into
+    # place, so readers (e.g. the backend DataService) never see a partially
+    # written file. An encoding or write failure leaves the previous report
+    # intact; each rename is atomic, but the set of files is not swapped as one
+    path.mkdir(parents=True, exist_ok=True)
+
+    payloads = {
+        path / name: (
+            content.encode()
+            if isinstance(content, str)
+            else encode_json(content, compact)
+        )
+        for name, content in artifacts.items()
+    }
+
+    tmp_files = {target: target.with_name(f"{target.name}.tmp") for target in payloads}
+    try:
+        for target, payload in payloads.items():
+            tmp_files[target].write_bytes(payload)
+        for target, tmp_file in tmp_files.items():
+            tmp_file.replace(target)
+    except Exception:
+        for tmp_file in tmp_files.values():
+            tmp_file.unlink(missing_ok=True)
+        raise
+
+    return list(payloads)
+
+
+def generate_report(
+    df: pd.DataFrame,
+    path: Path = Path("reports"),
+    compact: bool = False,
+    max_workers: int = REPORT_MAX_WORKERS,
+) -> list[Path]:
+    print("Generating report...")
 
-    print(f"Report saved: {report_path}")
+    context = build_report_context(df)
+
+    if max_workers <= 1:
+        results = [build_section(builder, context) for _, builder in SECTIONS]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_section_worker,
+            initargs=(context,),
+        ) as executor:
+            futures = [
+                executor.submit(build_worker_section, builder)
+                for _, builder in SECTIONS
+            ]
+            results = [future.result() for future in futures]
+
+    # Assemble in section order regardless of which finished first
+    sections = {}
+    artifacts = {}
+    for (name, _), (markdown, section_artifacts) in zip(SECTIONS, results):
+        sections[name] = markdown
+        artifacts.update(section_artifacts)
+
+    sections["generated"] = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    artifacts["REPORT.md"] = load_template("report")(sections)
+
+    files = write_artifacts(artifacts, path, compact)
+
+    print(f"Report saved: {path / 'REPORT.md'}")
+    return files
@@ -0,0 +1,200 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from services.calculation import compute_roi_metrics
+from services.configs import (
+    DEBT_SIGMA,
+    EARNINGS_SIGMA,
+    INCOME_TO_PAYOFF,
+    MONTE_CARLO_BINS,
+    MONTE_CARLO_CHUNK_SIZE,
+    MONTE_CARLO_SEED_BLOCK,
+    RATE_OF_EARNING_GROWTH,
+    RATE_OF_EARNING_GROWTH_SD,
+    TAX_RATE,
+    TAX_RATE_SD,
+    YEARS_OF_TUITION,
+)
+
+SIMULATED_METRICS = ["roi_5yr_w_tuition", "payback_years", "debt_to_income"]
+
+
+def simulate_draws(
+    tuition: np.ndarray,
+    earnings: np.ndarray,
+    debt: np.ndarray,
+    block_sizes: list[int],
+    block_seeds: list[np.random.SeedSequence],
+) -> dict[str, np.ndarray]:
+    # Each seed block draws from its own generator, so a draw's value depends
+    # only on the run seed and its position, not on how blocks are chunked
+    earnings_draws, debt_draws, growth, tax = [], [], [], []
+    for n_draws, seed in zip(block_sizes, block_seeds):
+        rng = np.random.default_rng(seed)
+        shape = (len(earnings), n_draws)
+
+        # Earnings and debt vary per field; growth and tax are economy-wide, so
+        # each draw shares them across fields
+        earnings_draws.append(
+            earnings[:, np.newaxis] * rng.lognormal(0, EARNINGS_SIGMA, shape)
+        )
+        debt_draws.append(debt[:, np.newaxis] * rng.lognormal(0, DEBT_SIGMA, shape))
+        growth.append(
+            rng.normal(RATE_OF_EARNING_GROWTH, RATE_OF_EARNING_GROWTH_SD, n_draws)
+        )
+        tax.append(np.clip(rng.normal(TAX_RATE, TAX_RATE_SD, n_draws), 0, 0.9))
+
+    metrics = compute_roi_metrics(
+        tuition[:, np.newaxis],
+        np.concatenate(earnings_draws, axis=1),
+        np.concatenate(debt_draws, axis=1),
+        np.concatenate(tax)[np.newaxis, :],
+        INCOME_TO_PAYOFF,
+        np.concatenate(growth)[np.newaxis, :],
+        YEARS_OF_TUITION,
+    )
+
+    # Simulated metrics as fields x draws
+    return {metric: metrics[metric] for metric in SIMULATED_METRICS}
+
+
+def histogram_ranges(draws: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Per-field [low, high) from a pilot sample, widened by its spread on both
+    # sides so that later draws almost never fall outside it
+    finite = np.isfinite(draws)
+    low = np.where(finite, draws, np.inf).min(axis=1)
+    high = np.where(finite, draws, -np.inf).max(axis=1)
+    # Fields with no finite pilot draw get an arbitrary range around 0
+    low, high = np.where(low <= high, low, 0), np.where(low <= high, high, 0)
+    spread = np.where(high > low, high - low, np.maximum(np.abs(high), 1.0))
+    return low - spread, high + spread
+
+
+def histogram_counts(
+    draws: np.ndarray, low: np.ndarray, high: np.ndarray
+) -> np.ndarray:
+    # Per-field counts over MONTE_CARLO_BINS equal bins, plus one bin each for
+    # -inf and +inf; finite draws outside the range are clamped into it
+    n_fields = len(draws)
+    width = (high - low)[:, np.newaxis] / MONTE_CARLO_BINS
+    bins = np.floor((draws - low[:, np.newaxis]) / width)
+    bins = np.clip(
+        np.nan_to_num(bins, nan=0, posinf=0, neginf=0), 0, MONTE_CARLO_BINS - 1
+    )
+    bins = np.where(
+        draws == -np.inf, -1, np.where(draws == np.inf, MONTE_CARLO_BINS, bins)
+    )
+    offsets = np.arange(n_fields)[:, np.newaxis] * (MONTE_CARLO_BINS + 2)
+    counts = np.bincount(
+        (offsets + bins + 1).astype(np.int64).ravel(),
+        minlength=n_fields * (MONTE_CARLO_BINS + 2),
+    )
+    return counts.reshape(n_fields, MONTE_CARLO_BINS + 2)
+
+
+def histogram_percentiles(
+    counts: np.ndarray,
+    low: np.ndarray,
+    high: np.ndarray,
+    percentiles: tuple[float, ...],
+) -> np.ndarray:
+    # Percentiles (as np.percentile's linear rank) of each field's histogram,
+    # assuming the draws in a bin are spread evenly across it
+    width = (high - low) / MONTE_CARLO_BINS
+    cumulative = np.cumsum(counts, axis=1)
+    rows = np.arange(len(counts))
+    bands = []
+    for q in percentiles:
+        rank = q / 100 * (cumulative[:, -1] - 1)
+        bins = (cumulative <= np.floor(rank)[:, np.newaxis]).sum(axis=1)
+        before = np.where(bins > 0, cumulative[rows, bins - 1], 0)
+        within = (rank - before + 0.5) / counts[rows, bins]
+        values = low + width * (bins - 1 + np.clip(within, 0, 1))
+        values = np.where(bins == 0, -np.inf, values)
+        bands.append(np.where(bins == MONTE_CARLO_BINS + 1, np.inf, values))
+    return np.array(bands)
+
+
+def simulate_chunk(
+    tuition: np.ndarray,
+    earnings: np.ndarray,
+    debt: np.ndarray,
+    block_sizes: list[int],
+    block_seeds: list[np.random.SeedSequence],
+    ranges: dict[str, tuple[np.ndarray, np.ndarray]],
+) -> dict[str, np.ndarray]:
+    draws = simulate_draws(tuition, earnings, debt, block_sizes, block_seeds)
+
+    # Only fixed-size histograms (fields x bins per metric) outlive the chunk
+    return {
+        metric: histogram_counts(draws[metric], *ranges[metric])
+        for metric in SIMULATED_METRICS
+    }
+
+
+def simulate_roi(
+    df: pd.DataFrame,
+    n_draws: int = 100_000,
+    seed: int | None = None,
+    chunk_size: int = MONTE_CARLO_CHUNK_SIZE,
+    max_workers: int = 1,
+    percentiles: tuple[float, ...] = (5, 50, 95),
+) -> pd.DataFrame:
+    tuition = df["tuition"].to_numpy(dtype=float)
+    earnings = df["earnings_2024_adjusted"].to_numpy(dtype=float)
+    debt = df["estimated_debt"].to_numpy(dtype=float)
+
+    # Draws are simulated in chunks of whole seed blocks and each chunk is
+    # reduced to per-field histograms, so memory stays bounded by the chunk
+    # size and the bin count however many draws are taken. Histogram ranges
+    # come from the first block, so results are identical serial or in
+    # parallel and for any chunk size
+    block_sizes = [
+        min(MONTE_CARLO_SEED_BLOCK, n_draws - start)
+        for start in range(0, n_draws, MONTE_CARLO_SEED_BLOCK)
+    ]
+    block_seeds = np.random.SeedSequence(seed).spawn(len(block_sizes))
+    pilot = simulate_draws(tuition, earnings, debt, block_sizes[:1], block_seeds[:1])
+    ranges = {metric: histogram_ranges(pilot[metric]) for metric in SIMULATED_METRICS}
+
+    blocks_per_chunk = max(1, chunk_size // MONTE_CARLO_SEED_BLOCK)
+    args = [
+        (
+            tuition,
+            earnings,
+            debt,
+            block_sizes[start : start + blocks_per_chunk],
+            block_seeds[start : start + blocks_per_chunk],
+            ranges,
+        )
+        for start in range(0, len(block_sizes), blocks_per_chunk)
+    ]
+
+    # Histograms are merged as chunks finish rather than collected
+    counts = {
+        metric: np.zeros((len(df), MONTE_CARLO_BINS + 2), dtype=np.int64)
+        for metric in SIMULATED_METRICS
+    }
+
+    def merge(chunk: dict[str, np.ndarray]):
+        for metric in SIMULATED_METRICS:
+            counts[metric] += chunk[metric]
+
+    if max_workers <= 1:
+        for chunk_args in args:
+            merge(simulate_chunk(*chunk_args))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for chunk in executor.map(simulate_chunk, *zip(*args)):
+                merge(chunk)
+
+    # Percentiles over all draws pooled
+    result = df[["field"]].copy()
+    for metric in SIMULATED_METRICS:
+        bands = histogram_percentiles(counts[metric], *ranges[metric], percentiles)
+        for q, band in zip(percentiles, bands):
+            result[f"{metric}_p{q:g}"] = band
+
+    return result
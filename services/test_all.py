@@ -1,14 +1,55 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+import json
+import os
 import shutil
+import sqlite3
 import tempfile
+import threading
+import time
+import zipfile
 import numpy as np
 import pandas as pd
 import pytest
+import requests
 
-from services.calculation import calculate_roi_by_field
-from services.normalization import normalize_ref_date
-from services.plots import generate_all_plots
-from services.report import generate_report
+from services.calculation import (
+    amortized_payback_years,
+    calculate_roi_all_students,
+    calculate_roi_by_field,
+    calculate_roi_scenarios,
+    calculate_roi_time_series,
+    scenario_grid,
+)
+from services.configs import (
+    DOWNLOAD_MAX_AGE,
+    MONTE_CARLO_SEED_BLOCK,
+    PROVINCES,
+    STAT_CAN_FILTERS,
+    TUITION_FIELD_MAP,
+)
+from services.database import export_roi_database
+from services.fetch import (
+    download_statcan_table,
+    fetch_all_statcan_tables,
+    fetch_statcan_table,
+)
+from services.normalization import normalize_field_names, normalize_ref_date
+from services.plots import generate_all_plots, generate_segment_plots, place_labels
+from services import main, pipeline, plots, report
+from services.preparation import (
+    estimate_debt_by_fields,
+    merge_time_series,
+    prepare_tuition_data,
+)
+from services.report import (
+    build_report_context,
+    generate_methodology,
+    generate_report,
+    load_template,
+    write_artifacts,
+)
+from services.simulation import simulate_draws, simulate_roi
 
 
 @pytest.fixture
@@ -56,6 +97,77 @@ def temp_dir():
     shutil.rmtree(temp)
 
 
+@pytest.fixture
+def statcan_zip(temp_dir):
+    """Minimal StatCan-style table ZIP in a raw data directory"""
+    raw = temp_dir / "raw"
+    raw.mkdir()
+    df = pd.DataFrame(
+        {
+            "REF_DATE": ["2013/2014", "2022/2023", "2023/2024"],
+            "GEO": ["Canada", "Canada", "Ontario"],
+            "Field of study": ["Education", "Law", "Law"],
+            "UOM": ["Dollars", "Dollars", "Dollars"],
+            "VALUE": [5000.0, 12000.0, 13000.0],
+        }
+    )
+    zip_path = raw / "37100003-eng.zip"
+    with zipfile.ZipFile(zip_path, "w") as z:
+        z.writestr("37100003.csv", df.to_csv(index=False))
+        z.writestr("37100003_MetaData.csv", "unused")
+    return zip_path
+
+
+@pytest.fixture
+def statcan_server(statcan_zip):
+    """Local HTTP stand-in for the StatCan CSV endpoint (ETag + Range aware).
+    URLs under /unavailable/ answer 503; under /misranged/ ranges start at 0"""
+    payload = statcan_zip.read_bytes()
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(dict(self.headers))
+
+            if self.path.startswith("/unavailable/"):
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            start = 0
+            if self.headers.get("Range") and self.headers.get("If-Range") == '"v1"':
+                if not self.path.startswith("/misranged/"):
+                    start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}"
+                )
+            else:
+                self.send_response(200)
+
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(payload) - start))
+            self.end_headers()
+            self.wfile.write(payload[start:])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}/", payload, requests_seen
+
+    server.shutdown()
+    server.server_close()
+
+
 class TestCalculations:
     def test_normalize_ref_date_converts_academic_year(self):
         df = pd.DataFrame({"REF_DATE": ["2020/2021"]})
@@ -63,6 +175,35 @@ class TestCalculations:
         assert result["REF_DATE"].iloc[0] == 2020
         assert result["REF_DATE"].dtype == np.int64
 
+    def test_normalize_field_names_maps_unique_labels(self):
+        df = pd.DataFrame(
+            {
+                "Field of study": ["Law [12]", "Law", "Dance [3]", None, "Law [12]"],
+                "VALUE": [1, 2, 3, 4, 5],
+            }
+        )
+        result = normalize_field_names(df, {"Law": "law"})
+
+        assert list(result["VALUE"]) == [1, 2, 5]
+        assert list(result["field"]) == ["law", "law", "law"]
+        assert list(result["Field of study"]) == ["Law", "Law", "Law"]
+        assert result.attrs["unmapped_fields"] == ["Dance"]
+        assert list(df["Field of study"])[0] == "Law [12]"
+
+    def test_prepare_reports_unmapped_fields(self, capsys):
+        mapped_label = next(iter(TUITION_FIELD_MAP))
+        df = pd.DataFrame(
+            {
+                "REF_DATE": ["2023/2024", "2023/2024"],
+                "Field of study": [mapped_label, "Basket weaving [3]"],
+                "VALUE": [12000.0, 5000.0],
+            }
+        )
+
+        prepare_tuition_data(df)
+
+        assert "Unmapped fields: ['Basket weaving']" in capsys.readouterr().out
+
     def test_calculate_roi_adds_required_columns(self, sample_data):
         result = calculate_roi_by_field(sample_data)
 
@@ -103,10 +244,509 @@ class TestCalculations:
 
         assert abs(actual - expected) / expected < 0.1
 
+    def test_provinces_prepared_in_one_pass(self):
+        df = pd.DataFrame(
+            {
+                "REF_DATE": ["2022/2023", "2023/2024", "2023/2024", "2023/2024"],
+                "GEO": ["Ontario", "Ontario", "Ontario", "Quebec"],
+                "Field of study": ["Law", "Law", "Law", "Law"],
+                "VALUE": [1.0, 10000.0, 12000.0, 4000.0],
+            }
+        )
+
+        tuition = prepare_tuition_data(df, ["GEO"])
+        assert list(tuition["GEO"]) == ["Ontario", "Quebec"]
+        assert list(tuition["tuition"]) == [11000.0, 4000.0]
+
+        debts = estimate_debt_by_fields(
+            pd.Series(
+                [20000.0, 10000.0], index=pd.Index(["Ontario", "Quebec"], name="GEO")
+            ),
+            tuition,
+            ["GEO"],
+        )
+        assert list(debts["estimated_debt"]) == [20000.0, 10000.0]
+
+    def test_latest_year_taken_per_province(self):
+        # Quebec has not published 2023/2024 yet; its 2022/2023 row is kept
+        df = pd.DataFrame(
+            {
+                "REF_DATE": ["2022/2023", "2023/2024", "2022/2023"],
+                "GEO": ["Ontario", "Ontario", "Quebec"],
+                "Field of study": ["Law", "Law", "Law"],
+                "VALUE": [1.0, 10000.0, 4000.0],
+            }
+        )
+
+        tuition = prepare_tuition_data(df, ["GEO"])
+
+        assert list(zip(tuition["REF_DATE"], tuition["GEO"], tuition["tuition"])) == [
+            (2022, "Quebec", 4000.0),
+            (2023, "Ontario", 10000.0),
+        ]
+
+        with pytest.raises(Exception, match="duplicates"):
+            estimate_debt_by_fields(
+                pd.Series([1.0, 2.0], index=pd.Index(["Quebec", "Quebec"], name="GEO")),
+                tuition,
+                ["GEO"],
+            )
+
+    def test_time_series_roi_for_every_year(self):
+        tuition = pd.DataFrame(
+            {
+                "REF_DATE": [2020, 2020, 2021, 2021],
+                "field": ["law", "arts", "law", "arts"],
+                "tuition": [10000.0, 5000.0, 12000.0, 6000.0],
+            }
+        )
+        enrollment = tuition.rename(columns={"tuition": "enrollment"})
+        earnings = pd.DataFrame(
+            {
+                "REF_DATE": [2018, 2018, 2021],
+                "field": ["law", "arts", "law"],
+                "earnings_2018": [60000.0, 40000.0, 70000.0],
+            }
+        )
+        debt = pd.DataFrame({"REF_DATE": [2020], "debt_2018": [30000.0]})
+
+        result = calculate_roi_time_series(
+            merge_time_series(tuition, earnings, enrollment, debt)
+        )
+
+        assert result.index.names == ["REF_DATE", "field"]
+        assert len(result) == 4
+        # Amounts are in each REF_DATE's dollars, so no column names a year
+        assert not result.columns.str.contains("2018|2024").any()
+        # 2021 law uses the 2021 earnings as-is; 2021 arts carries 2018 forward
+        assert result.loc[(2021, "law"), "earnings_adjusted"] == 70000.0
+        assert result.loc[(2021, "arts"), "earnings_adjusted"] == pytest.approx(
+            40000.0 * 141.6 / 133.4
+        )
+        assert result.loc[(2020, "law"), "estimated_debt"] == pytest.approx(40000.0)
+        assert "roi_5yr_w_tuition" in result.columns
+
+    def test_amortized_payback_closed_form(self):
+        debt = np.array([30000.0, 30000.0, 30000.0])
+        payment = np.array([3000.0, 3000.0, 1000.0])
+
+        np.testing.assert_allclose(amortized_payback_years(debt, payment), [10, 10, 30])
+
+        # Level payments at 5%: n = -ln(1 - rB/P) / ln(1 + r); 1000/yr never repays
+        with_interest = amortized_payback_years(debt, payment, interest_rate=0.05)
+        expected = -np.log(1 - 0.05 * 30000 / 3000) / np.log(1.05)
+        np.testing.assert_allclose(with_interest[:2], expected)
+        assert np.isinf(with_interest[2])
+
+        # Growing payments shorten payback; a grace period adds accrued interest
+        growing = amortized_payback_years(
+            debt, payment, interest_rate=0.05, payment_growth=1.03
+        )
+        grace = amortized_payback_years(
+            debt, payment, interest_rate=0.05, grace_years=1
+        )
+        assert growing[0] < expected
+        assert np.isfinite(growing[2])
+        assert grace[0] > expected + 1
+
+    def test_scenarios_match_default_assumptions(self, sample_data):
+        expected = calculate_roi_by_field(sample_data.copy())
+        result = calculate_roi_scenarios(sample_data)
+
+        for col in ["roi_5yr_w_tuition", "payback_years", "debt_to_income"]:
+            np.testing.assert_allclose(result[col][:, 0], expected[col])
+
+    def test_scenario_grid_broadcasts_fields_by_scenarios(self, sample_data):
+        grid = scenario_grid(
+            tax_rate=[0.2, 0.25, 0.3], income_to_payoff=np.linspace(0.05, 0.2, 4)
+        )
+        result = calculate_roi_scenarios(sample_data, **grid)
+
+        assert {values.shape for values in result.values()} == {(3, 12)}
+        # Higher tax and lower repayment share both lengthen payback
+        payback = result["payback_years"][0].reshape(3, 4)
+        assert (np.diff(payback, axis=0) > 0).all()
+        assert (np.diff(payback, axis=1) < 0).all()
+
+    def test_roi_all_students_by_segment(self):
+        df = pd.DataFrame(
+            {
+                "GEO": ["Ontario", "Ontario", "Quebec"],
+                "roi_5yr_w_tuition": [1.0, 3.0, 2.0],
+                "enrollment": [1, 3, 5],
+            }
+        )
+
+        result = calculate_roi_all_students(df, ["GEO"])
+
+        assert result["Ontario"] == 2.5
+        assert result["Quebec"] == 2.0
+        assert calculate_roi_all_students(df) == pytest.approx(20 / 9)
+
+
+class TestSimulation:
+    def test_bands_bracket_point_estimate(self, sample_data):
+        point = calculate_roi_by_field(sample_data.copy())
+        result = simulate_roi(sample_data, n_draws=50_000, seed=0, chunk_size=7_000)
+
+        for metric in ["roi_5yr_w_tuition", "payback_years", "debt_to_income"]:
+            assert (result[f"{metric}_p5"] < result[f"{metric}_p50"]).all()
+            assert (result[f"{metric}_p50"] < result[f"{metric}_p95"]).all()
+        np.testing.assert_allclose(
+            result["debt_to_income_p50"], point["debt_to_income"], rtol=0.02
+        )
+
+    def test_histogram_percentiles_match_pooled_draws(self, sample_data):
+        # Chunks keep only histograms; their percentiles stay within a bin or
+        # so of the exact percentiles of the same draws
+        n_draws = 5_000
+        result = simulate_roi(sample_data, n_draws=n_draws, seed=3, chunk_size=2_000)
+
+        seeds = np.random.SeedSequence(3).spawn(n_draws // MONTE_CARLO_SEED_BLOCK)
+        draws = simulate_draws(
+            sample_data["tuition"].to_numpy(dtype=float),
+            sample_data["earnings_2024_adjusted"].to_numpy(dtype=float),
+            sample_data["estimated_debt"].to_numpy(dtype=float),
+            [MONTE_CARLO_SEED_BLOCK] * len(seeds),
+            seeds,
+        )
+        for metric, values in draws.items():
+            exact = np.percentile(values, [5, 50, 95], axis=1)
+            for q, band in zip([5, 50, 95], exact):
+                np.testing.assert_allclose(result[f"{metric}_p{q}"], band, rtol=1e-3)
+
+    def test_seeded_results_independent_of_workers(self, sample_data):
+        serial = simulate_roi(sample_data, n_draws=10_000, seed=42, chunk_size=3_000)
+        parallel = simulate_roi(
+            sample_data, n_draws=10_000, seed=42, chunk_size=3_000, max_workers=2
+        )
+
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_results_independent_of_chunk_size(self, sample_data):
+        # Percentiles are taken over the pooled draws, and a short last chunk
+        # (10_500 = 3 x 3_000 + 1_500) must not skew them
+        results = [
+            simulate_roi(sample_data, n_draws=10_500, seed=7, chunk_size=chunk_size)
+            for chunk_size in [1_000, 3_000, 10_500]
+        ]
+
+        for result in results[1:]:
+            pd.testing.assert_frame_equal(results[0], result)
+
+
+class TestFetch:
+    def test_fetch_filters_years_from_cached_zip(self, statcan_zip, temp_dir):
+        result = fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache_path=None, revalidate=False
+        )
+
+        assert list(result["REF_DATE"]) == ["2022/2023", "2023/2024"]
+
+    def test_fetch_projects_schema_columns(self, statcan_zip, temp_dir):
+        cache = temp_dir / "parsed"
+        fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache, revalidate=False
+        )
+        result = fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache, revalidate=False
+        )
+
+        assert list(result.columns) == ["REF_DATE", "GEO", "Field of study", "VALUE"]
+        assert isinstance(result["GEO"].dtype, pd.CategoricalDtype)
+        assert isinstance(result["Field of study"].dtype, pd.CategoricalDtype)
+        assert result["VALUE"].dtype == np.float64
+
+    def test_fetch_pushes_down_filters(self, statcan_zip, temp_dir):
+        result = fetch_statcan_table(
+            "37-10-0003-01",
+            statcan_zip.parent,
+            cache_path=None,
+            revalidate=False,
+            filters={
+                "years_include": ["2022/2023", "2023/2024"],
+                "field_of_study_exclude": ["Education"],
+            },
+        )
+
+        assert list(result["GEO"]) == ["Canada"]
+        assert list(result["GEO"].cat.categories) == ["Canada"]
+        assert list(result["VALUE"]) == [12000.0]
+
+    def test_parsed_cache_reused_until_zip_changes(self, statcan_zip, temp_dir):
+        cache = temp_dir / "parsed"
+        first = fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache, revalidate=False
+        )
+        cached_files = list(cache.glob("*.parquet"))
+        assert len(cached_files) == 1
+
+        second = fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache, revalidate=False
+        )
+        pd.testing.assert_frame_equal(first, second)
+
+        with zipfile.ZipFile(statcan_zip, "w") as z:
+            z.writestr(
+                "37100003.csv",
+                "REF_DATE,GEO,Field of study,VALUE\n2024/2025,Canada,Law,1\n",
+            )
+        third = fetch_statcan_table(
+            "37-10-0003-01", statcan_zip.parent, cache, revalidate=False
+        )
+
+        assert list(third["VALUE"]) == [1]
+        assert list(cache.glob("*.parquet")) != cached_files
+        assert len(list(cache.glob("*.parquet"))) == 1
+
+    def test_parsed_cache_kept_per_filters(self, statcan_zip, temp_dir, capsys):
+        cache = temp_dir / "parsed"
+        national = {**STAT_CAN_FILTERS["tuition"], "locations_include": ["Canada"]}
+        provincial = {**STAT_CAN_FILTERS["tuition"], "locations_include": PROVINCES}
+
+        for filters in [national, provincial, national, provincial]:
+            fetch_statcan_table(
+                "37-10-0003-01",
+                statcan_zip.parent,
+                cache,
+                revalidate=False,
+                filters=filters,
+            )
+
+        # Switching between national and provincial runs reuses both entries
+        assert capsys.readouterr().out.count("Using parsed cache") == 2
+        assert len(list(cache.glob("*.parquet"))) == 2
+
+    def test_parallel_fetch_matches_serial(self, statcan_zip, temp_dir):
+        shutil.copy(statcan_zip, statcan_zip.parent / "37100011-eng.zip")
+        sources = {"tuition": "37-10-0003-01", "enrollments": "37-10-0011-01"}
+
+        serial = fetch_all_statcan_tables(
+            sources,
+            statcan_zip.parent,
+            cache_path=None,
+            max_workers=1,
+            revalidate=False,
+        )
+        parallel = fetch_all_statcan_tables(
+            sources,
+            statcan_zip.parent,
+            cache_path=None,
+            max_workers=2,
+            revalidate=False,
+        )
+
+        assert list(parallel) == list(sources)
+        for name in sources:
+            pd.testing.assert_frame_equal(serial[name], parallel[name])
+
+
+class TestPipeline:
+    @pytest.fixture
+    def toy_stages(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(pipeline, "STAGES", {})
+
+        @pipeline.stage(memoize=False)
+        def source(params):
+            calls.append("source")
+            return pd.DataFrame({"x": [1, 2, 3]})
+
+        @pipeline.stage(deps=["source"], uses=["factor"])
+        def doubled(params, source):
+            calls.append("doubled")
+            return source * params["factor"]
+
+        @pipeline.stage(deps=["doubled"])
+        def total(params, doubled):
+            calls.append("total")
+            return int(doubled["x"].sum())
+
+        return calls
+
+    def test_unchanged_stages_loaded_from_disk(self, toy_stages, temp_dir):
+        first = pipeline.run_pipeline(["total"], {"factor": 2}, temp_dir)
+        toy_stages.clear()
+        second = pipeline.run_pipeline(["total"], {"factor": 2}, temp_dir)
+
+        assert first == second == {"total": 12}
+        assert toy_stages == ["source"]
+
+    def test_changed_params_rerun_stages(self, toy_stages, temp_dir):
+        pipeline.run_pipeline(["total"], {"factor": 2}, temp_dir)
+        toy_stages.clear()
+        outputs = pipeline.run_pipeline(["total"], {"factor": 3}, temp_dir)
+
+        assert outputs == {"total": 18}
+        assert toy_stages == ["source", "doubled", "total"]
+
+    def test_unused_params_do_not_rerun_stages(self, toy_stages, temp_dir):
+        pipeline.run_pipeline(["total"], {"factor": 2}, temp_dir)
+        toy_stages.clear()
+        pipeline.run_pipeline(["total"], {"factor": 2, "reports_dir": "x"}, temp_dir)
+
+        assert toy_stages == ["source"]
+
+    def test_deleted_outputs_written_again(self, monkeypatch, complete_data, temp_dir):
+        output_stages = {
+            name: pipeline.STAGES[name] for name in ["reports", "roi_database"]
+        }
+        monkeypatch.setattr(pipeline, "STAGES", {})
+
+        @pipeline.stage()
+        def roi(params):
+            return complete_data
+
+        pipeline.STAGES.update(output_stages)
+        reports_path = temp_dir / "reports"
+        params = {"reports_dir": str(reports_path)}
+        pipeline.run_pipeline(list(output_stages), params, temp_dir / "cache")
+        (reports_path / "REPORT.md").unlink()
+
+        stats = {}
+        pipeline.run_pipeline(
+            list(output_stages), params, temp_dir / "cache", stats=stats
+        )
+
+        assert stats["reports"]["status"] == "run"
+        assert stats["roi_database"]["status"] == "cached"
+        assert (reports_path / "REPORT.md").exists()
+
+    def test_roi_leaves_merged_output_unchanged(
+        self, monkeypatch, sample_data, temp_dir
+    ):
+        roi_stage = pipeline.STAGES["roi"]
+        monkeypatch.setattr(pipeline, "STAGES", {"roi": roi_stage})
+
+        @pipeline.stage()
+        def merged(params):
+            return sample_data
+
+        params = {"by_province": False, "time_series": False}
+        computed = pipeline.run_pipeline(["merged", "roi"], params, temp_dir)
+        loaded = pipeline.run_pipeline(["merged"], params, temp_dir)
+
+        assert "roi_5yr_w_tuition" in computed["roi"].columns
+        pd.testing.assert_frame_equal(computed["merged"], loaded["merged"])
+
+    def test_time_series_fetches_every_year(self, monkeypatch):
+        fetched = {}
+        monkeypatch.setattr(
+            pipeline,
+            "fetch_all_statcan_tables",
+            lambda tables, filters: fetched.update(filters),
+        )
+
+        pipeline.tables({"by_province": True, "time_series": True})
+
+        assert "2015/2016" in fetched["tuition"]["years_include"]
+        assert "2015/2016" in fetched["enrollments"]["years_include"]
+        assert 2015 in fetched["earnings"]["years_include"]
+        assert fetched["tuition"]["locations_include"] == pipeline.PROVINCES
+
+    def test_stage_metrics_written(self, toy_stages, temp_dir):
+        stats = {}
+        pipeline.run_pipeline(
+            ["total"], {"factor": 2}, temp_dir, stats=stats, trace_memory=True
+        )
+        metrics_file = pipeline.write_run_metrics(stats, {}, temp_dir / "run.json")
+        metrics = json.loads(metrics_file.read_text())
+
+        assert metrics["stages"]["doubled"]["rows_in"] == {"source": 3}
+        assert metrics["stages"]["doubled"]["rows_out"] == 3
+        assert metrics["stages"]["total"]["cpu_seconds"] >= 0
+        assert metrics["stages"]["total"]["peak_rss_increase_mb"] >= 0
+        assert metrics["run_wall_seconds"] >= 0
+        assert metrics["cached_load_seconds"] == 0
+        assert "traced_peak_mb" in metrics["stages"]["total"]
+
+
+class TestMain:
+    def test_mode_and_output_dirs(self):
+        args = main.parse_args(["--mode", "provincial", "--reports-dir", "out"])
+
+        assert main.MODES[args.mode]["by_province"]
+        assert args.reports_dir == "out"
+        assert args.stages == pipeline.OUTPUT_STAGES
+
+
+class TestDownload:
+    def test_download_then_revalidate_unchanged(self, statcan_server, temp_dir):
+        base_url, payload, requests_seen = statcan_server
+        path = temp_dir / "downloads"
+
+        zip_path = download_statcan_table("37-10-0003-01", path, base_url)
+        assert zip_path.read_bytes() == payload
+
+        download_statcan_table("37-10-0003-01", path, base_url)
+        assert requests_seen[-1]["If-None-Match"] == '"v1"'
+        assert zip_path.read_bytes() == payload
+
+    def test_copy_without_validators_kept_until_max_age(
+        self, statcan_server, statcan_zip, temp_dir
+    ):
+        base_url, payload, requests_seen = statcan_server
+        path = temp_dir / "downloads"
+        path.mkdir()
+        zip_path = path / "37100003-eng.zip"
+        shutil.copy(statcan_zip, zip_path)
+
+        download_statcan_table("37-10-0003-01", path, base_url)
+        assert requests_seen == []
+
+        stale = time.time() - DOWNLOAD_MAX_AGE.total_seconds() - 60
+        os.utime(zip_path, (stale, stale))
+        download_statcan_table("37-10-0003-01", path, base_url)
+        assert len(requests_seen) == 1
+        assert json.loads((path / "37100003-eng.json").read_text())["etag"] == '"v1"'
+
+    def test_resumes_partial_download(self, statcan_server, temp_dir):
+        base_url, payload, requests_seen = statcan_server
+        path = temp_dir / "downloads"
+        path.mkdir()
+        (path / "37100003-eng.zip.part").write_bytes(payload[:10])
+        (path / "37100003-eng.part.json").write_text('{"etag": "\\"v1\\""}')
+
+        zip_path = download_statcan_table("37-10-0003-01", path, base_url)
+
+        assert requests_seen[-1]["Range"] == "bytes=10-"
+        assert zip_path.read_bytes() == payload
+        assert not (path / "37100003-eng.zip.part").exists()
+
+    def test_misranged_resume_restarts_download(self, statcan_server, temp_dir):
+        base_url, payload, requests_seen = statcan_server
+        path = temp_dir / "downloads"
+        path.mkdir()
+        (path / "37100003-eng.zip.part").write_bytes(payload[:10])
+        (path / "37100003-eng.part.json").write_text('{"etag": "\\"v1\\""}')
+
+        zip_path = download_statcan_table(
+            "37-10-0003-01", path, f"{base_url}misranged/"
+        )
+
+        assert "Range" not in requests_seen[-1]
+        assert zip_path.read_bytes() == payload
+
+    def test_server_error_falls_back_to_cached_copy(self, statcan_server, temp_dir):
+        base_url, payload, requests_seen = statcan_server
+        path = temp_dir / "downloads"
+        download_statcan_table("37-10-0003-01", path, base_url)
+
+        zip_path = download_statcan_table(
+            "37-10-0003-01", path, f"{base_url}unavailable/"
+        )
+        assert zip_path.read_bytes() == payload
+
+        with pytest.raises(requests.HTTPError):
+            download_statcan_table(
+                "37-10-0003-01", temp_dir / "empty", f"{base_url}unavailable/"
+            )
+
 
 class TestOutputs:
-    def test_all_plots_generated(self, complete_data, temp_dir):
-        generate_all_plots(complete_data, temp_dir)
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_all_plots_generated(self, complete_data, temp_dir, max_workers):
+        generate_all_plots(complete_data, temp_dir, max_workers=max_workers)
 
         plots = [
             "tuition_vs_earnings.png",
@@ -119,9 +759,220 @@ class TestOutputs:
             path = temp_dir / plot
             assert path.exists()
 
+    def test_unchanged_plots_not_rerendered(self, complete_data, temp_dir):
+        generate_all_plots(complete_data, temp_dir, max_workers=1)
+        mtimes = {f.name: f.stat().st_mtime_ns for f in temp_dir.glob("*.png")}
+
+        complete_data.loc[0, "payback_years"] = 25.0
+        generate_all_plots(complete_data, temp_dir, max_workers=1)
+
+        changed = {
+            f.name
+            for f in temp_dir.glob("*.png")
+            if f.stat().st_mtime_ns != mtimes[f.name]
+        }
+        assert changed == {"payback_years.png", "payback_years_thumb.png"}
+
+    def test_plot_helper_changes_rerender(self, complete_data, monkeypatch, temp_dir):
+        generate_all_plots(complete_data, temp_dir, max_workers=1)
+        mtimes = {f.name: f.stat().st_mtime_ns for f in temp_dir.glob("*.png")}
+
+        # e.g. an edit to place_labels, which lives outside every plotter
+        monkeypatch.setattr(plots, "module_source", lambda name: b"edited helper")
+        generate_all_plots(complete_data, temp_dir, max_workers=1)
+
+        assert all(
+            f.stat().st_mtime_ns != mtimes[f.name] for f in temp_dir.glob("*.png")
+        )
+
+    def test_configured_renditions_generated(self, complete_data, temp_dir):
+        renditions = {
+            "web": {"format": "webp", "dpi": 50},
+            "thumbnail": {"format": "png", "dpi": 20, "suffix": "_thumb"},
+            "vector": {"format": "svg"},
+        }
+        generate_all_plots(
+            complete_data, temp_dir, max_workers=1, renditions=renditions
+        )
+
+        assert {f.name for f in temp_dir.glob("roi_by_field*")} == {
+            "roi_by_field.webp",
+            "roi_by_field_thumb.png",
+            "roi_by_field.svg",
+        }
+        assert not (temp_dir / "roi_by_field.png").exists()
+
+    def test_segments_drawn_as_small_multiples(self, complete_data, temp_dir):
+        segments = pd.concat(
+            [complete_data.assign(GEO=f"Region {i}") for i in range(5)],
+            ignore_index=True,
+        )
+        renditions = {"web": {"format": "png", "dpi": 20}}
+        generate_segment_plots(
+            segments, "GEO", temp_dir, per_figure=4, renditions=renditions
+        )
+
+        assert {f.name for f in temp_dir.glob("*.png")} == {
+            "debt_to_income_by_geo_1.png",
+            "debt_to_income_by_geo_2.png",
+            "payback_years_by_geo_1.png",
+            "payback_years_by_geo_2.png",
+        }
+
+    def test_overlapping_labels_placed_apart(self):
+        x = np.array([100.0, 100.0, 100.0, 400.0])
+        y = np.array([100.0, 100.0, 100.0, 100.0])
+        widths = np.array([60.0, 60.0, 60.0, 60.0])
+
+        offsets = place_labels(x, y, widths, height=12.0)
+
+        centres = np.column_stack([x, y]) + offsets
+        assert len({tuple(c) for c in centres[:3]}) == 3
+        assert (offsets[3] == offsets[0]).all()
+
+    def test_database_replaced_on_each_export(self, complete_data, temp_dir):
+        db_path = temp_dir / "RoiAnalysis.db"
+        export_roi_database(complete_data, db_path)
+
+        complete_data["payback_years"] = [np.inf, 11.7, 11.7]
+        export_roi_database(complete_data, db_path)
+
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute(
+                'SELECT "Field", "Enrollment", "PaybackYears" FROM "FieldData" '
+                'ORDER BY "Id"'
+            ).fetchall()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list('FieldData')")}
+
+        assert rows == [
+            ("education", 3000000, None),
+            ("comp_sci", 5000000, 11.7),
+            ("business", 15000000, 11.7),
+        ]
+        assert version == 1
+        assert "IX_FieldData_Keys" in indexes
+        assert not list(temp_dir.glob("*.tmp"))
+
+    def test_database_missing_values(self, complete_data, temp_dir):
+        # Left merges leave enrollment and debt missing for some fields
+        complete_data["enrollment"] = [np.nan, 15000000, 5000000]
+        complete_data["estimated_debt"] = [np.nan, 30000, 28000]
+        db_path = export_roi_database(complete_data, temp_dir / "RoiAnalysis.db")
+
+        with sqlite3.connect(db_path) as conn:
+            row = conn.execute(
+                'SELECT "Enrollment", "EstimatedDebt" FROM "FieldData" '
+                "WHERE \"Field\" = 'education'"
+            ).fetchone()
+
+        assert row == (0, None)
+
     def test_report_file_generated(self, complete_data, temp_dir):
         generate_report(complete_data, temp_dir)
 
         md_path = temp_dir / "REPORT.md"
 
         assert md_path.exists()
+
+    def test_report_rendered_from_templates(self, complete_data, temp_dir):
+        generate_report(complete_data, temp_dir)
+        generate_report(complete_data.iloc[:2], temp_dir / "variant")
+
+        report = (temp_dir / "REPORT.md").read_text()
+        variant = (temp_dir / "variant" / "REPORT.md").read_text()
+
+        assert "### Comp Sci" in report
+        assert "### Comp Sci" not in variant
+        assert "{" not in report
+        assert load_template.cache_info().hits > 0
+
+    def test_methodology_states_configured_loan_terms(self, monkeypatch):
+        artifacts = {}
+        generate_methodology({}, artifacts)
+        payback = artifacts["methodology.json"]["assumptions"]["payback_calculation"]
+        assert payback["interest_rate"] == 0.0
+        assert "ln(" not in payback["formula"]
+
+        monkeypatch.setattr(report, "INTEREST_RATE", 0.05)
+        monkeypatch.setattr(report, "GRACE_PERIOD_YEARS", 1)
+        section = generate_methodology({}, artifacts)
+        payback = artifacts["methodology.json"]["assumptions"]["payback_calculation"]
+
+        assert payback["interest_rate"] == 0.05
+        assert payback["grace_period_years"] == 1
+        assert "ln(" in payback["formula"]
+        assert "Interest at 5% a year" in section
+        assert "No interest" not in section
+
+    def test_report_points_at_web_renditions(self, complete_data, temp_dir):
+        generate_report(complete_data, temp_dir)
+
+        viz = json.loads((temp_dir / "visualizations.json").read_text())
+        roi = next(v for v in viz["visualizations"] if v["name"].startswith("ROI"))
+        report = (temp_dir / "REPORT.md").read_text()
+
+        assert roi["filename"] == "roi_by_field.png"
+        assert roi["renditions"]["web"] == "roi_by_field.webp"
+        assert roi["renditions"]["thumbnail"] == "roi_by_field_thumb.png"
+        assert "](../figures/roi_by_field.webp)" in report
+        assert "](../figures/roi_by_field.png)" not in report
+
+    def test_parallel_report_matches_serial(self, complete_data, temp_dir):
+        generate_report(complete_data, temp_dir / "serial", max_workers=1)
+        generate_report(complete_data, temp_dir / "parallel", max_workers=2)
+
+        for name in ["REPORT.md", "analysis.json", "rankings.json", "roi_table.csv"]:
+            serial = (temp_dir / "serial" / name).read_text().splitlines()
+            parallel = (temp_dir / "parallel" / name).read_text().splitlines()
+            assert [line for line in serial if "Generated" not in line] == [
+                line for line in parallel if "Generated" not in line
+            ]
+
+    def test_artifacts_written_atomically(self, temp_dir):
+        (temp_dir / "summary.json").write_text("old")
+        artifacts = {
+            "summary.json": {"count": np.int64(3), "values": np.array([1.5, 2.5])},
+            "REPORT.md": "# Report\n",
+        }
+
+        write_artifacts(artifacts, temp_dir, compact=True)
+
+        assert json.loads((temp_dir / "summary.json").read_text()) == {
+            "count": 3,
+            "values": [1.5, 2.5],
+        }
+        assert " " not in (temp_dir / "summary.json").read_text()
+        assert not list(temp_dir.glob("*.tmp"))
+
+    def test_non_finite_values_written_as_null(self, temp_dir):
+        artifacts = {
+            "summary.json": {
+                "payback_years": np.float64(np.inf),
+                "values": [float("nan"), 2.5],
+            }
+        }
+
+        write_artifacts(artifacts, temp_dir)
+
+        assert json.loads((temp_dir / "summary.json").read_text()) == {
+            "payback_years": None,
+            "values": [None, 2.5],
+        }
+
+    def test_report_context_computed_once(self, complete_data):
+        context = build_report_context(complete_data)
+
+        assert [row["field"] for row in context["by_roi"]] == [
+            "education",
+            "comp_sci",
+            "business",
+        ]
+        assert context["best_roi"]["field_name"] == "Education"
+        assert context["fastest_payback"]["field"] == "education"
+        assert [row["roi_comparison"] for row in context["by_roi"]] == [
+            "above",
+            "below",
+            "below",
+        ]
+        assert type(context["by_roi"][0]["tuition"]) is int
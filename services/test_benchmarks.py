@@ -0,0 +1,257 @@
+from functools import cache
+import os
+from pathlib import Path
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.calculation import calculate_roi_by_field
+from services.configs import (
+    EARNINGS_FIELD_MAP,
+    ENROLLMENTS_FIELD_MAP,
+    FIELDS,
+    STAT_CAN_FILTERS,
+    STAT_CAN_TABLES,
+    TUITION_FIELD_MAP,
+)
+from services.fetch import parse_statcan_table
+from services.normalization import normalize_field_names
+from services.plots import generate_all_plots
+from services.preparation import (
+    estimate_debt_by_fields,
+    merge_dfs,
+    prepare_debt_data,
+    prepare_earnings_data,
+    prepare_enrollment_data,
+    prepare_tuition_data,
+)
+from services.report import generate_report
+
+# Table-level hot paths run at 10^3 up to 10^5 rows; BENCHMARK_MAX_ROWS=10000000
+# opts into the 10^6 and 10^7 sweeps, which take hours. The suite is deselected
+# from plain `pytest` runs (see pytest.ini) and run through services/Makefile
+BENCHMARK_MAX_ROWS = int(os.environ.get("BENCHMARK_MAX_ROWS", "100000"))
+
+# Below this many rows a case runs in a few milliseconds, where scheduler noise
+# swamps real regressions; such cases are reported but not gated (see Makefile)
+GATED_MIN_ROWS = 10**4
+
+SCALES = [
+    pytest.param(n_rows, marks=() if n_rows >= GATED_MIN_ROWS else pytest.mark.ungated)
+    for n_rows in (10**exponent for exponent in range(3, 8))
+    if n_rows <= BENCHMARK_MAX_ROWS
+]
+
+# Plots and the report hold one row per field, so they scale by field count
+FIELD_SCALES = [len(FIELDS), 100]
+
+TUITION_YEARS = ["2020/2021", "2021/2022", "2022/2023", "2023/2024"]
+EARNINGS_YEARS = [2018, 2019, 2020]
+DEBT_YEARS = [2015, 2020]
+DEBT_STATISTICS = [
+    "Average debt owed to the source at graduation",
+    "Median debt owed to the source at graduation",
+]
+DEBT_SOURCES = [
+    "Graduates who owed money for their education to any source (government or non-government)",
+    "Graduates who owed money for their education to government-sponsored student loans",
+    "Graduates who owed money for their education to non-government sources",
+]
+
+
+def regions(n_rows: int, rows_per_region: int) -> list[str]:
+    # Rows scale through the number of GEO segments, like the provincial run
+    return [f"Region {i}" for i in range(max(1, n_rows // rows_per_region))]
+
+
+def dimension_grid(**dimensions) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product(list(dimensions.values()), names=dimensions)
+    return index.to_frame(index=False).astype(
+        {name: "category" for name in dimensions if name != "REF_DATE"}
+    )
+
+
+@cache
+def raw_table(name: str, n_rows: int) -> pd.DataFrame:
+    """Synthetic StatCan table (as parsed) with about n_rows rows"""
+    rng = np.random.default_rng(0)
+    if name == "debt":
+        geos = regions(
+            n_rows, len(DEBT_YEARS) * len(DEBT_STATISTICS) * len(DEBT_SOURCES)
+        )
+        df = dimension_grid(
+            REF_DATE=DEBT_YEARS,
+            GEO=geos,
+            **{
+                "Level of study": ["Bachelor's"],
+                "Statistics": DEBT_STATISTICS,
+                "Type of debt source": DEBT_SOURCES,
+            },
+        )
+        df["VALUE"] = rng.uniform(15000, 40000, len(df))
+        return df
+
+    field_map, years, low, high = {
+        "tuition": (TUITION_FIELD_MAP, TUITION_YEARS, 3000, 25000),
+        "earnings": (EARNINGS_FIELD_MAP, EARNINGS_YEARS, 30000, 90000),
+        "enrollments": (ENROLLMENTS_FIELD_MAP, TUITION_YEARS, 100, 50000),
+    }[name]
+    # Some labels carry StatCan footnote markers, as in the real tables
+    labels = [
+        f"{label} [{i}]" if i % 3 == 0 else label for i, label in enumerate(field_map)
+    ]
+    df = dimension_grid(
+        REF_DATE=years,
+        GEO=regions(n_rows, len(years) * len(labels)),
+        **{"Field of study": labels},
+    )
+    df["VALUE"] = rng.uniform(low, high, len(df))
+    return df
+
+
+@cache
+def prepared_tables(n_rows: int) -> dict[str, pd.DataFrame]:
+    tuition = prepare_tuition_data(raw_table("tuition", n_rows), ["GEO"])
+    debt = prepare_debt_data(raw_table("debt", n_rows), ["GEO"])
+    return {
+        "tuition": tuition,
+        "earnings": prepare_earnings_data(raw_table("earnings", n_rows), ["GEO"]),
+        "enrollment": prepare_enrollment_data(
+            raw_table("enrollments", n_rows), ["GEO"]
+        ),
+        "debt_by_field": estimate_debt_by_fields(
+            debt.groupby("GEO", observed=True)["debt_2024"].mean(), tuition, ["GEO"]
+        ),
+    }
+
+
+def roi_table(n_fields: int) -> pd.DataFrame:
+    """ROI table shaped like calculate_roi_by_field output, one row per field"""
+    rng = np.random.default_rng(0)
+    fields = [
+        FIELDS[i] if i < len(FIELDS) else f"{FIELDS[i % len(FIELDS)]}_{i}"
+        for i in range(n_fields)
+    ]
+    tuition = rng.uniform(3000, 25000, n_fields)
+    earnings_2018 = rng.uniform(30000, 90000, n_fields)
+    df = pd.DataFrame(
+        {
+            "field": fields,
+            "tuition": tuition,
+            "earnings_2018": earnings_2018,
+            "earnings_2024_adjusted": earnings_2018 * 1.2,
+            "estimated_debt": tuition * 3,
+            "enrollment": rng.integers(100, 50000, n_fields),
+        }
+    )
+    return calculate_roi_by_field(df)
+
+
+@pytest.fixture
+def output_dir(tmp_path) -> Path:
+    return tmp_path / "out"
+
+
+@pytest.mark.benchmark(group="fetch")
+@pytest.mark.parametrize("n_rows", SCALES)
+def test_parse_statcan_table(benchmark, tmp_path, n_rows):
+    df = raw_table("tuition", n_rows)
+    zip_path = tmp_path / "37100003-eng.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+        with z.open("37100003.csv", "w") as f:
+            df.to_csv(f, index=False)
+    filters = {
+        **STAT_CAN_FILTERS["tuition"],
+        "locations_include": list(df["GEO"].cat.categories),
+    }
+
+    result = benchmark(
+        parse_statcan_table, STAT_CAN_TABLES["tuition"], zip_path, None, filters
+    )
+    assert len(result) == len(df)
+
+
+@pytest.mark.benchmark(group="normalize")
+@pytest.mark.parametrize("n_rows", SCALES)
+def test_normalize_field_names(benchmark, n_rows):
+    df = raw_table("tuition", n_rows)
+
+    result = benchmark(normalize_field_names, df, TUITION_FIELD_MAP)
+    assert result["field"].notna().all()
+
+
+@pytest.mark.benchmark(group="prepare")
+@pytest.mark.parametrize("n_rows", SCALES)
+@pytest.mark.parametrize(
+    "name, prepare",
+    [
+        ("tuition", prepare_tuition_data),
+        ("earnings", prepare_earnings_data),
+        ("enrollments", prepare_enrollment_data),
+        ("debt", prepare_debt_data),
+    ],
+)
+def test_prepare(benchmark, name, prepare, n_rows):
+    df = raw_table(name, n_rows)
+
+    result = benchmark(prepare, df, ["GEO"])
+    assert len(result) > 0
+
+
+@pytest.mark.benchmark(group="merge")
+@pytest.mark.parametrize("n_rows", SCALES)
+def test_merge_dfs(benchmark, n_rows):
+    tables = prepared_tables(n_rows)
+
+    result = benchmark(
+        merge_dfs,
+        tables["tuition"],
+        tables["earnings"],
+        tables["enrollment"],
+        tables["debt_by_field"],
+        ["GEO"],
+    )
+    assert len(result) > 0
+
+
+@pytest.mark.benchmark(group="calculate")
+@pytest.mark.parametrize("n_rows", SCALES)
+def test_calculate_roi_by_field(benchmark, n_rows):
+    tables = prepared_tables(n_rows)
+    merged = merge_dfs(
+        tables["tuition"],
+        tables["earnings"],
+        tables["enrollment"],
+        tables["debt_by_field"],
+        ["GEO"],
+    )
+
+    result = benchmark(calculate_roi_by_field, merged)
+    assert "roi_5yr_w_tuition" in result.columns
+
+
+@pytest.mark.benchmark(group="plots")
+@pytest.mark.parametrize("n_fields", FIELD_SCALES)
+def test_generate_all_plots(benchmark, output_dir, n_fields):
+    df = roi_table(n_fields)
+
+    # Uncached and in-process, so each round renders every figure and rendition;
+    # a few rounds after a warmup keep the default run short but comparable
+    benchmark.pedantic(
+        generate_all_plots,
+        args=(df, output_dir),
+        kwargs={"max_workers": 1, "use_cache": False},
+        rounds=3,
+        warmup_rounds=1,
+    )
+    assert (output_dir / "roi_by_field.png").exists()
+
+
+@pytest.mark.benchmark(group="report")
+@pytest.mark.parametrize("n_fields", FIELD_SCALES)
+def test_generate_report(benchmark, output_dir, n_fields):
+    df = roi_table(n_fields)
+
+    benchmark(generate_report, df, output_dir)
+    assert (output_dir / "REPORT.md").exists()